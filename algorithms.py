@@ -2,262 +2,1039 @@ import numpy as np
 import grid as gd
 import heapq as heap
 import heuristics as h
+import incremental as inc
+import transposition as tp
+import wavefront as wf
 from matplotlib import pyplot
+import stats as st
 import random
 import math
-import random
+import numbers
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
 
-def hardestDFSMaze(dimm):
+def hardestDFSMaze(dimm, cacheSize=4096, restarts=8, workers=None, seed=None, corpus=None):
     """
     Attempts to find the maze that causes DFS to have the largest fringe
-    @params dimm: the dimension of the desired maze
+    @params dimm: the dimension of the desired maze, cacheSize: most mazes kept in each restart's cache,
+        restarts: number of random restarts, workers: processes to run them on (all cores by default, 1 runs them here),
+        seed: int or SeedSequence, the same seed gives the same maze whatever the number of workers,
+        corpus: optional corpus file (see gd.writeCorpus) to append the maze to, it's created if it doesn't exist.
+        Its metadata names the search and holds the seed of every maze in it, fresh entropy included
     @return The hardest maze
     """
-    bestFringe = 0
-    bestMaze = []
-    for i in range(8): #Random restart loop. We will take the best maximum out of every restart
-        print(i, flush=True)
-        maze = gd.generateSolvableGrid(dimm, .3, DFS)
-        largestFringe = 0
-        hardestMaze = maze
-        time = 1
-        while time < 20000: #This is our search loop, we have this many iterations to find a local maximum
-            _, path, fringeSize = DFS(maze, (0, 0), (dimm-1, dimm-1))
-            #This if represents taking a step into a new state in our local search
-            #We always step forward if its better, or with the simulated annealing probability function discussed in class
-            if fringeSize >= largestFringe or random.random() < math.exp(-abs(fringeSize - largestFringe) * time / 200):
-                largestFringe = fringeSize
-                hardestMaze = maze
-
-            maze = mutateMaze(maze, DFS, path)
-            time += 1
-
-        #This tracks the best local maximum we've found so far
-        if largestFringe > bestFringe:
-            bestFringe = largestFringe
-            bestMaze = hardestMaze
-
-    return hardestMaze
-
-def hardestAStarMaze(dimm):
+    return hardestMaze(DFSFringe, dimm, cacheSize, restarts, workers, seed, corpus)
+
+def hardestAStarMaze(dimm, cacheSize=4096, restarts=8, workers=None, seed=None, corpus=None):
     """
     Attempts to find the maze that causes A* to have the most expanded nodes
-    @params dimm: the dimension of the desired maze
+    @params same as hardestDFSMaze
     @return The hardest maze
     """
-    bestExpansion = 0
-    bestMaze = []
-    for i in range(8): #Random restart loop. We will take the best maximum out of every restart
-        print(i, flush=True)
-        maze = gd.generateSolvableGrid(dimm, .3, aStarManhattan)
-        largestExpansion = 0
-        hardestMaze = maze
-        time = 1
-        while time < 20000: #This is our search loop, we have this many iterations to find a local maximum
-            _, path, info = aStarManhattan(maze, (0, 0), (dimm-1, dimm-1))
-            _, explored, _ = info
-            expansionSize = len(explored)
-            #This if represents taking a step into a new state in our local search
-            #We always step forward if its better, or with the simulated annealing probability function discussed in class
-            if expansionSize >= largestExpansion or random.random() < math.exp(-abs(expansionSize - largestExpansion) * time / 200):
-                largestExpansion = expansionSize
-                hardestMaze = maze
+    return hardestMaze(aStarExpansions, dimm, cacheSize, restarts, workers, seed, corpus)
+
+def hardestMaze(score, dimm, cacheSize=4096, restarts=8, workers=None, seed=None, corpus=None):
+    """
+    Runs the random restarts of a hardest maze search, spread over a pool of processes
+    Every restart gets its own child of one SeedSequence, so its result only depends on the seed and its index, not on
+    which process runs it or in what order. Restarts are reported as they finish, and the best maze is kept at the end
+    @params score: DFSFringe or aStarExpansions (has to be a module level function so it can be sent to other processes),
+        others are the same as hardestDFSMaze
+    @return The hardest maze
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    record = seedRecord(root) #kept even when the entropy is fresh, so a saved maze can always be found again
+    if (corpus is not None and os.path.exists(corpus)):
+        #checked up front, so a corpus that can't take the maze doesn't throw away a search that's already been done
+        header = gd.readCorpusHeader(corpus)
+        if (header["dimm"] != dimm):
+            raise ValueError(str(corpus) + " holds " + str(header["dimm"]) + " x " + str(header["dimm"]) + " mazes, not " + str(dimm) + " x " + str(dimm))
+        if (header["metadata"].get("search") != score.__name__):
+            raise ValueError(str(corpus) + " holds mazes from " + str(header["metadata"].get("search")) + ", not " + score.__name__)
+        seeds = header["metadata"].get("seeds", [header["seed"]] * header["count"]) + [record]
+        gd.corpusHeader(dict(header, metadata=dict(header["metadata"], seeds=seeds))) #raises if the seeds don't fit
+    seeds = root.spawn(restarts)
+    if (workers is None):
+        workers = os.cpu_count() or 1
+    results = [None] * restarts
+    if (workers <= 1):
+        for i, child in enumerate(seeds):
+            results[i] = annealMaze(score, dimm, child, cacheSize)
+            print("restart", i, "finished with", results[i][0], "(" + str(i + 1), "/", str(restarts) + ")", flush=True)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, restarts)) as pool:
+            futures = {pool.submit(annealMaze, score, dimm, child, cacheSize): i for i, child in enumerate(seeds)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                results[i] = future.result()
+                print("restart", i, "finished with", results[i][0], "(" + str(done), "/", str(restarts) + ")", flush=True)
+
+    hits, lookups, rate = tp.hitRate({"hits": sum(result[2]["hits"] for result in results),
+        "misses": sum(result[2]["misses"] for result in results)})
+    print("cache hits:", hits, "/", lookups, "(" + str(round(100 * rate, 2)) + "%)", flush=True)
+    #This tracks the best local maximum we've found, the earliest restart wins a tie so every run picks the same one
+    best = max(range(restarts), key=lambda i: results[i][0])
+    if (corpus is not None):
+        if (os.path.exists(corpus)):
+            header = gd.readCorpusHeader(corpus)
+            gd.appendCorpus(corpus, results[best][1],
+                {"seeds": header["metadata"].get("seeds", [header["seed"]] * header["count"]) + [record]})
+        else:
+            #the header's seed only takes an int, the full record (spawn key and all) is in the metadata
+            gd.writeCorpus(corpus, results[best][1], seed=record if isinstance(record, int) else None,
+                metadata={"search": score.__name__, "seeds": [record]})
+    return results[best][1]
+
+def seedRecord(sequence):
+    """
+    JSON form of a SeedSequence that's enough to build it again: its entropy, or its entropy and spawn key
+    if it's a spawned child
+    """
+    entropy = sequence.entropy
+    entropy = int(entropy) if isinstance(entropy, numbers.Integral) else [int(value) for value in entropy]
+    if (not sequence.spawn_key):
+        return entropy
+    return {"entropy": entropy, "spawnKey": [int(key) for key in sequence.spawn_key]}
 
-            maze = mutateMaze(maze, aStarManhattan, path)
-            time += 1
+def annealMaze(score, dimm, seed, cacheSize=4096, iterations=20000):
+    """
+    One random restart of the hardest maze search: simulated annealing from a random solvable maze
+    Search results are cached on the maze's Zobrist hash, so going back to a maze we've already seen (like flipping
+    a cell back) doesn't search it again
+    @params score: function returning (difficulty, path) for a maze, dimm: the dimension of the desired maze,
+        seed: int or SeedSequence for this restart, cacheSize: most mazes kept in the cache, iterations: length of the search
+    @return the local maximum, the maze it was found on, the cache's hits and misses (the cache itself is too big
+        to send back from a worker)
+    """
+    generator = np.random.default_rng(seed)
+    rng = random.Random(int(generator.integers(2**63))) #for the mutations and the annealing test
+    table = tp.zobristTable(dimm, generator)
+    cache = tp.newCache(cacheSize)
+    maze = gd.generateSolvableGrid(dimm, .3, seed=generator)
+    mazeHash = tp.zobristHash(maze, table)
+    separating = None #separating cell index, kept across mutations and only rebuilt after a cell gets blocked
+    largest = 0
+    hardest = maze
+    time = 1
+    while time < iterations: #This is our search loop, we have this many iterations to find a local maximum
+        cached = tp.cacheLookup(cache, mazeHash)
+        if (cached is None):
+            cached = score(maze)
+            tp.cacheStore(cache, mazeHash, cached)
+        difficulty, path = cached
+        #This if represents taking a step into a new state in our local search
+        #We always step forward if its better, or with the simulated annealing probability function discussed in class
+        if difficulty >= largest or rng.random() < math.exp(-abs(difficulty - largest) * time / 200):
+            largest = difficulty
+            hardest = maze
 
-        #This tracks the best local maximum we've found so far
-        if largestExpansion > bestExpansion:
-            bestExpansion = largestExpansion
-            bestMaze = hardestMaze
+        y, x, separating = mutateCell(maze, path, separating, rng)
+        if (maze[y][x] == gd.UNBLOCKED):
+            #blocking a cell can make others separating. Opening one can't, so after an opening the old index
+            #is still a safe (if cautious) filter
+            separating = None
+        maze = flipCell(maze, y, x)
+        mazeHash ^= table[y][x]
+        time += 1
+    return largest, hardest, {"hits": cache["hits"], "misses": cache["misses"]}
 
-    return hardestMaze
+def DFSFringe(maze):
+    """
+    Difficulty of a maze for DFS: its largest fringe, along with the path it found
+    """
+    stats = st.newStats()
+    _, path, _ = DFS(maze, (0, 0), (len(maze)-1, len(maze)-1), stats)
+    return stats["peakFringe"], path
 
-def aStarManhattan(maze, start, goal):
+def aStarExpansions(maze):
     """
-    This function is just an alias to running aStar with the Manhattan heuristic for the purpose of
-    retaining one mutateMaze implementation
+    Difficulty of a maze for A* with the Manhattan heuristic: the number of nodes it expanded, along with the path it found
     """
-    return aStar(maze, start, goal, h.Manhattan)
+    stats = st.newStats()
+    _, path, _ = aStarManhattan(maze, (0, 0), (len(maze)-1, len(maze)-1), stats, False)
+    return stats["expansions"], path
 
-def mutateMaze(maze, algorithm, path):
+def hardestMazePopulation(fitness, dimm, size=32, generations=200, elite=2, mutations=2, workers=None, seed=None):
+    """
+    Attempts to find the hardest maze with a genetic search over a whole population of mazes at once
+    The population is a (size, dimm, dimm) array. Every generation keeps the elite best mazes, and fills the rest with
+    children: two parents picked by tournament, one point crossover on rows, then a few random cell flips. Crossover
+    and flips are done for the whole population with array operations, and any child that ends up unsolvable is
+    fixed up in one batched isSolvable call (a bad flip is undone, a bad crossover is replaced by the first parent)
+    @params fitness: populationFringes, populationExpansions or populationLengths, dimm: the dimension of the desired
+        maze, size: number of mazes in the population, generations: number of generations, elite: mazes carried over
+        unchanged, mutations: cell flips per child, workers: processes to score the population on (all cores by
+        default, 1 scores it here), seed: int or SeedSequence
+    @return The hardest maze, its fitness
+    """
+    rng = np.random.default_rng(seed)
+    if (workers is None):
+        workers = os.cpu_count() or 1
+    population = np.empty((0, dimm, dimm), dtype=np.int8)
+    while (len(population) < size): #draw solvable starting mazes in batches
+        grids = gd.generateGrids(size, dimm, .3, rng)
+        population = np.concatenate((population, grids[gd.isSolvable(grids)]))[:size]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        scores = fitness(population, pool)
+        for generation in range(generations):
+            order = np.argsort(-scores, kind="stable")
+            if (generation % 10 == 0):
+                print("generation", generation, "best", scores[order[0]], flush=True)
+            #tournament selection: the fitter of two random mazes, for each parent of each child
+            children = size - elite
+            pairs = rng.integers(0, size, (2, children, 2))
+            parents = np.where(scores[pairs[..., 0]] >= scores[pairs[..., 1]], pairs[..., 0], pairs[..., 1])
+            #one point crossover: rows above the cut come from the first parent, the rest from the second
+            cuts = rng.integers(0, dimm + 1, children)
+            fromFirst = np.arange(dimm)[np.newaxis, :, np.newaxis] < cuts[:, np.newaxis, np.newaxis]
+            offspring = np.where(fromFirst, population[parents[0]], population[parents[1]])
+            broken = ~gd.isSolvable(offspring)
+            offspring[broken] = population[parents[0][broken]]
+            for _ in range(mutations):
+                flipMazes(offspring, rng)
+            population = np.concatenate((population[order[:elite]], offspring))
+            scores = np.concatenate((scores[order[:elite]], fitness(offspring, pool)))
+    finally:
+        if (pool is not None):
+            pool.shutdown()
+    best = np.argmax(scores)
+    return population[best].copy(), scores[best]
+
+def flipMazes(mazes, rng):
+    """
+    Flips one random cell (never the start or goal) in every maze of a stack, in place, like mutateMaze does for one
+    Flips that make a maze unsolvable are undone, so some mazes may be left unchanged
+    """
+    count, dimm, _ = mazes.shape
+    cells = rng.integers(0, dimm * dimm - 2, count) + 1 #flat indices between the start (0) and the goal (dimm * dimm - 1)
+    ys, xs = np.divmod(cells, dimm)
+    rows = np.arange(count)
+    before = mazes[rows, ys, xs].copy()
+    mazes[rows, ys, xs] = np.where(before == gd.BLOCKED, gd.UNBLOCKED, gd.BLOCKED)
+    broken = ~gd.isSolvable(mazes)
+    mazes[rows[broken], ys[broken], xs[broken]] = before[broken]
+
+def populationFringes(population, pool=None):
+    """
+    Batched DFSFringe: the largest DFS fringe of every maze in a stack, spread over pool if one is given
+    """
+    return np.array([fringe for fringe, _ in mapMazes(DFSFringe, population, pool)])
+
+def populationExpansions(population, pool=None):
+    """
+    Batched aStarExpansions: the number of nodes A* expands on every maze in a stack, spread over pool if one is given
+    """
+    return np.array([expansions for expansions, _ in mapMazes(aStarExpansions, population, pool)])
+
+def populationLengths(population, pool=None):
+    """
+    Shortest path length of every maze in a stack, from a single wavefront BFS over the whole stack
+    """
+    _, lengths = wf.wavefrontBFS(population)
+    return lengths
+
+def mapMazes(score, population, pool):
+    """
+    Applies score to every maze of a stack, in chunks over the pool's processes if there is one
+    """
+    if (pool is None):
+        return [score(maze) for maze in population]
+    return list(pool.map(score, population, chunksize=-(-len(population) // (os.cpu_count() or 1))))
+
+def aStarManhattan(maze, start, goal, stats=None, debug=True):
+    """
+    This function is just an alias to running aStar with the Manhattan heuristic, so both hardest maze
+    searches call their algorithm the same way
+    """
+    return aStar(maze, start, goal, h.Manhattan, stats=stats, debug=debug)
+
+def mutateMaze(maze, path, separating=None, rng=random):
     """
     Changes the given maze by changing either a space to a wall or a wall to a space
-    @params maze: given maze to be mutate, algorithm: which algorithm to use to check solvability,
-        path: current path (to be used to influence mutation)
+    @params maze: given maze to be mutate, path: current path (to be used to influence mutation),
+        separating: output of gd.separatingCells for this maze, worked out when it's first needed if not given,
+        rng: random.Random instance (or the random module) to draw from
     @return the new maze
     """
+    y, x, _ = mutateCell(maze, path, separating, rng)
+    return flipCell(maze, y, x)
+
+def mutateCell(maze, path, separating=None, rng=random):
+    """
+    Picks the cell mutateMaze flips, without flipping it, so callers can track the change (e.g. in a Zobrist hash)
+    Opening a wall can't make the maze unsolvable, and blocking a space only can if it's one of the cells that
+    separate start from goal, so each candidate is checked with one lookup instead of a search
+    @params maze: given maze to be mutate, path: current path (to be used to influence mutation),
+        separating: output of gd.separatingCells for this maze (or for an earlier version of it that only had more
+        walls), worked out here when it's first needed if not given, rng: random.Random instance (or the random module)
+    @return (y, x) of the cell to flip, and the separating index (None if it wasn't needed), so callers can reuse it
+    """
     dimm = len(maze)-1
     #This loop keeps us from creating an unsolvable maze, it returns once it finds a solvable one
     while True:
-        newMaze = maze.copy()
         x = 0
         y = 0
         #This loop attempts to find a random place in the maze to mutate that won't violate any rules
         while x == 0 and y == 0 or x == dimm and y == dimm or x < 0 or y < 0 or x > dimm or y > dimm:
-            if random.random() < 0.8: #Take a purely random location
-                x = random.randint(0, dimm)
-                y = random.randint(0, dimm)
+            if rng.random() < 0.8: #Take a purely random location
+                x = rng.randint(0, dimm)
+                y = rng.randint(0, dimm)
             else: #Take a location near the current path, since a mutation there is more likely to increase maze difficulty
                 deviation = [(0, 0), (0, 1), (1, 0), (-1, 0), (0, -1)]
-                x, y = tuple(sum(x) for x in zip(random.choice(path), random.choice(deviation)))
-        newMaze[y][x] = -1 if newMaze[y][x] == 0 else 0
-        solved, _, _ = algorithm(newMaze, (0, 0), (dimm, dimm))
-        if solved: #As long as the maze is solvable, we're good to return
-            return newMaze
+                x, y = tuple(sum(x) for x in zip(rng.choice(path), rng.choice(deviation)))
+        if maze[y][x] == -1: #opening a wall is always fine
+            return y, x, separating
+        if separating is None: #only needed once we try to block something, and then it holds until the maze changes
+            separating = gd.separatingCells(maze)
+        if not separating[y][x]: #As long as the maze is still solvable, we're good to return
+            return y, x, separating
 
+def flipCell(maze, y, x):
+    """
+    @return a copy of maze with cell (y, x) switched between a space and a wall
+    """
+    newMaze = maze.copy()
+    newMaze[y][x] = -1 if newMaze[y][x] == 0 else 0
+    return newMaze
 
-def DFS(grid, start, goal):
+def DFS(grid, start, goal, stats=None):
     """
     Runs a DFS search from start to goal on the given grid
-    @params grid: selected grid, start: starting coordinates, goal: goal coordinates
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates,
+        stats: optional collector from st.newStats to report expansions, pushes, fringe and phase times to
     @return True/False if a path exists or not, order of nodes used to traverse path if one exists
     """
-    frontier = [(start, None)] #acts as stack
-    closedList = dict() #list of nodes already explored
-    current = start #our curent node
-    largestFringe = 0
-    while (len(frontier) > 0):
-        largestFringe = max(largestFringe, len(frontier))
-        current, previous = frontier.pop(0)
-        y, x = current
-        closedList.update({current: previous})
-        if (current == goal):
-            return (True, makePath(start, goal, closedList), largestFringe)
-        #scan surrounding elements and add them to the closed list
-        for newCoord in ((y, x-1), (y-1, x), (y, x+1), (y+1, x)): #it's ordered in this way to make it nice and short in a lot of cases, but priority doesn't really matter for DFS
-            newY, newX = newCoord
-            if ((newY, newX) not in closedList and (newY, newX) not in [c for (c,_) in frontier] and scan(grid, (newY, newX))):
-                frontier.insert(0,((newY, newX), current))
+    solved, parents, _, _, largestFringe, width = searchKernel(grid, start, goal, True, stats, False) #DFS has no use for the expanded list
+    if (solved):
+        since = st.clock(stats)
+        path = flatPath(parents, goal, width)
+        st.phase(stats, "path", since)
+        return (True, path, largestFringe)
     return False, None, largestFringe
 
-def BFS(grid, start, goal):
+def BFS(grid, start, goal, stats=None, debug=True):
     """
     Runs a BFS search from start to goal on the given grid
     This is the exact same code as DFS, except we use a queue system instead of a stack
-    @params grid: selected grid, start: starting coordinates, goal: goal coordinates
-    @return True/False if a path exists or not, order of nodes used to traverse path if one exists
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates, stats: same as DFS,
+        debug: False skips building the debug data, for callers that only want the path and stats
+    @return True/False if a path exists or not, order of nodes used to traverse path if one exists,
+    tuple containing output debug data (None if debug is False)
     """
-    frontier = [(start, None)] #acts as queue
-    closedList = dict() #list of nodes already explored
-    current = start #our curent node
-    exploredNodes = []
-    while (len(frontier) > 0):
-        current, previous = frontier.pop(0)
-        exploredNodes.append(current)
-        y, x = current
-        closedList.update({current: previous})
-        if (current == goal):
-            return (True, makePath(start, goal, closedList), (len(closedList), exploredNodes, frontier))
-        #scan surrounding elements and add them to the closed list
-        for newCoord in ((y, x-1), (y-1, x), (y, x+1), (y+1, x)): #it's ordered in this way to make it nice and short in a lot of cases, but priority doesn't really matter for DFS
-            newY, newX = newCoord
-            if ((newY, newX) not in closedList and (newY, newX) not in [c for (c,_) in frontier] and scan(grid, (newY, newX))):
-                frontier.append(((newY, newX), current))
-    return False, None, ()
-
-def BDBFS(grid, start, goal):
+    solved, parents, expanded, frontier, _, width = searchKernel(grid, start, goal, False, stats, debug)
+    if (solved):
+        since = st.clock(stats)
+        path = flatPath(parents, goal, width)
+        st.phase(stats, "path", since)
+        if (not debug):
+            return True, path, None
+        exploredNodes = gd.gridCoordsList(expanded, width)
+        frontier = list(zip(gd.gridCoordsList(frontier, width), gd.gridCoordsList([parents[i] for i in frontier], width)))
+        return (True, path, (len(expanded), exploredNodes, frontier))
+    return False, None, () if debug else None
+
+def BDBFS(grid, start, goal, stats=None):
     """
     Runs a Bi-direction BFS search from start to goal on the given grid
-    @params grid: selected grid, start: starting coordinates, goal: goal coordinates
+    Both sides use the same flat arrays as searchKernel, plus a closed bitmap each so the meeting check is O(1)
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates, stats: same as DFS
     @return True/False if a path exists or not, order of nodes used to traverse path if one exists
     """
-    startFrontier = [(start, None)]
-    goalFrontier = [(goal, None)]
-    startClosedList = dict()
-    goalClosedList = dict()
-    currentStart = start
-    currentGoal = goal
+    since = st.clock(stats)
+    openCells, width, offsets = gd.flattenGrid(grid)
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    startFree = bytearray(openCells) #doubles as the visited bitmap: a node is cleared once it's been pushed
+    goalFree = bytearray(openCells)
+    startClosed = bytearray(len(openCells))
+    goalClosed = bytearray(len(openCells))
+    startParents = [-1] * len(openCells)
+    goalParents = [-1] * len(openCells)
+    startFrontier = deque([source])
+    goalFrontier = deque([target])
+    startFree[source] = goalFree[target] = 0
+    tracking = stats is not None #the fringe is only measured for a collector
+    largestFringe = 0
+    meeting = -1
+    since = st.phase(stats, "setup", since)
 
     while(len(startFrontier) > 0 and len(goalFrontier) > 0):
-        current, previous = startFrontier.pop(0)
-        y, x = current
-        startClosedList.update({current: previous})
-        if (current in goalClosedList):
-            goalPath = makePath(goal, current, goalClosedList)
-            return (True, list(map(tuple, np.concatenate((makePath(start, current, startClosedList), goalPath[len(goalPath)-2::-1])))))
-        #scan surrounding elements and add them to the closed list
-        for newCoord in ((y, x-1), (y-1, x), (y, x+1), (y+1, x)): #it's ordered in this way to make it nice and short in a lot of cases, but priority doesn't really matter for DFS
-            newY, newX = newCoord
-            if ((newY, newX) not in startClosedList and (newY, newX) not in [c for (c,_) in startFrontier] and scan(grid, (newY, newX))):
-                startFrontier.append(((newY, newX), current))
-
-        current, previous = goalFrontier.pop(0)
-        y, x = current
-        goalClosedList.update({current: previous})
-        if (current in startClosedList):
-            goalPath = makePath(goal, current, goalClosedList)
-            return (True, list(map(tuple, np.concatenate((makePath(start, current, startClosedList), goalPath[len(goalPath)-2::-1])))))
-        #scan surrounding elements and add them to the closed list
-        for newCoord in ((y, x-1), (y-1, x), (y, x+1), (y+1, x)): #it's ordered in this way to make it nice and short in a lot of cases, but priority doesn't really matter for DFS
-            newY, newX = newCoord
-            if ((newY, newX) not in goalClosedList and (newY, newX) not in [c for (c,_) in goalFrontier] and scan(grid, (newY, newX))):
-                goalFrontier.append(((newY, newX), current))
+        if (tracking and len(startFrontier) + len(goalFrontier) > largestFringe):
+            largestFringe = len(startFrontier) + len(goalFrontier)
+        current = startFrontier.popleft()
+        startClosed[current] = 1
+        if (goalClosed[current]):
+            meeting = current
+            break
+        for offset in offsets:
+            neighbour = current + offset
+            if (startFree[neighbour]):
+                startFree[neighbour] = 0
+                startParents[neighbour] = current
+                startFrontier.append(neighbour)
+
+        current = goalFrontier.popleft()
+        goalClosed[current] = 1
+        if (startClosed[current]):
+            meeting = current
+            break
+        for offset in offsets:
+            neighbour = current + offset
+            if (goalFree[neighbour]):
+                goalFree[neighbour] = 0
+                goalParents[neighbour] = current
+                goalFrontier.append(neighbour)
+    if (tracking):
+        expansions = startClosed.count(1) + goalClosed.count(1)
+        since = st.record(stats, since, expansions, expansions + len(startFrontier) + len(goalFrontier), largestFringe)
+    if (meeting == -1):
+        return False, None
+    path = joinPaths(startParents, goalParents, meeting, width)
+    st.phase(stats, "path", since)
+    return (True, path)
+
+def BDAStar(grid, start, goal, heuristic, tieSort=False, stats=None):
+    """
+    Runs a Bi-directional A* search from start to goal on the given grid
+    Each side is an A* search like aStar (lazy-deletion heap, flat arrays, closed bitmap) guided by a front-to-end
+    heuristic towards the other end: the forward side estimates the distance to goal and the backward side to start.
+    Every time a side reaches a node the other side has a g value for, that's a candidate path, and the best one
+    found so far has cost mu. Once the lowest f on either open list is at least mu no shorter path can exist, so
+    the search stops there rather than at the first meeting. The side with the smaller open list expands next.
+    Nodes with f >= mu are never pushed, and a node the other side has already closed isn't expanded again (BS*)
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates,
+        heuristic: consistent heuristic taking (coords, goal), tieSort: same as aStar, stats: same as DFS
+    @return True/False if a path exists or not, order of nodes used to traverse path if one exists
+    """
+    since = st.clock(stats)
+    openCells, width, offsets = gd.flattenGrid(grid)
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    #one entry per side: (g values, parents, closed bitmap, open list, node the heuristic aims at, its field if it has one)
+    forward = ([math.inf] * len(openCells), [-1] * len(openCells), bytearray(len(openCells)), [(0, 0, 0, 0, source)], goal,
+        h.flatField(heuristic, np.shape(grid), goal))
+    backward = ([math.inf] * len(openCells), [-1] * len(openCells), bytearray(len(openCells)), [(0, 0, 0, 0, target)], start,
+        h.flatField(heuristic, np.shape(grid), start))
+    forward[0][source] = 0
+    backward[0][target] = 0
+    best = math.inf if source != target else 0 #mu, the cost of the best path through a meeting node so far
+    meeting = source
+    pushes = 1
+    pruned = 0 #nodes whose f was worked out but weren't pushed
+    tracking = stats is not None
+    largestFringe = 0
+    since = st.phase(stats, "setup", since)
+    while (len(forward[3]) > 0 and len(backward[3]) > 0):
+        if (forward[3][0][0] >= best or backward[3][0][0] >= best): #no open node on that side can lead to a shorter path
+            break
+        if (tracking and len(forward[3]) + len(backward[3]) > largestFringe):
+            largestFringe = len(forward[3]) + len(backward[3])
+        side, other = (forward, backward) if len(forward[3]) <= len(backward[3]) else (backward, forward)
+        gVals, parents, closed, frontier, aim, hValues = side
+        otherG = other[0]
+        _, _, _, g, current = heap.heappop(frontier)
+        if (g != gVals[current] or closed[current]): #stale entry
+            continue
+        closed[current] = 1
+        if (other[2][current]): #the other side already expanded it, and the path through it is counted in mu
+            continue
+        currentG = g + 1
+        y, x = gd.gridCoords(current, width)
+        for offset, (dy, dx) in zip(offsets, ((0, -1), (-1, 0), (0, 1), (1, 0))):
+            neighbour = current + offset
+            if (not openCells[neighbour] or currentG >= gVals[neighbour]):
+                continue
+            gVals[neighbour] = currentG
+            parents[neighbour] = current
+            if (currentG + otherG[neighbour] < best): #the two searches touch here
+                best = currentG + otherG[neighbour]
+                meeting = neighbour
+            f = currentG + (hValues[neighbour] if hValues is not None else heuristic((y + dy, x + dx), aim))
+            if (f >= best): #can't be on a shorter path than the one we have
+                pruned += 1
+                continue
+            heap.heappush(frontier, (f, -currentG if tieSort else 0, pushes, currentG, neighbour))
+            pushes += 1
+    if (tracking):
+        estimates = pushes - 1 + pruned #every f but the two starting ones
+        since = st.record(stats, since, forward[2].count(1) + backward[2].count(1), pushes + 1, largestFringe, 0,
+            estimates if forward[5] is None else 0)
+    if (best == math.inf):
+        return False, None
+    path = joinPaths(forward[1], backward[1], meeting, width)
+    st.phase(stats, "path", since)
+    return (True, path)
+
+def searchKernel(grid, start, goal, lifo=False, stats=None, debug=True):
+    """
+    Shared array-backed search behind DFS and BFS. Nodes are flat indices from gd.flattenGrid, the frontier is a deque,
+    and a node is marked visited as soon as it's pushed, so checking whether it's already on the frontier is O(1)
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates,
+        lifo: True pops the frontier as a stack (DFS), False as a queue (BFS), stats: same as DFS,
+        debug: False doesn't keep the list of expanded nodes
+    @return True/False if goal was reached, parent array, expanded nodes in order (None if debug is False),
+        remaining frontier, largest fringe size, row width of the flattened grid
+    """
+    since = st.clock(stats)
+    openCells, width, offsets = gd.flattenGrid(grid)
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    free = openCells #visited bitmap, inverted: a node is cleared once it's been pushed
+    parents = [-1] * len(openCells)
+    expanded = [] if debug else None
+    expansions = 0
+    frontier = deque([source])
+    pop = frontier.pop if lifo else frontier.popleft
+    push = frontier.append
+    free[source] = 0
+    largestFringe = 0
+    since = st.phase(stats, "setup", since)
+    while (len(frontier) > 0):
+        if (len(frontier) > largestFringe):
+            largestFringe = len(frontier)
+        current = pop()
+        expansions += 1
+        if (debug):
+            expanded.append(current)
+        if (current == target):
+            #every node is pushed once, so the pushes are the expanded nodes plus what's left on the frontier
+            st.record(stats, since, expansions, expansions + len(frontier), largestFringe)
+            return True, parents, expanded, frontier, largestFringe, width
+        for offset in offsets: #left, up, right, down, same order as the original list based searches
+            neighbour = current + offset
+            if (free[neighbour]):
+                free[neighbour] = 0
+                parents[neighbour] = current
+                push(neighbour)
+    st.record(stats, since, expansions, expansions, largestFringe)
+    return False, parents, expanded, frontier, largestFringe, width
+
+def flatPath(parents, goal, width):
+    """
+    Traces a path back from the goal through a flat parent array and reverses it
+    @params parents: parent array from a flat search, goal: goal coords, width: row width of the flattened grid
+    @return path: array of coords from start to goal
+    """
+    current = gd.flatIndex(goal, width)
+    path = []
+    while (current != -1):
+        path.append(gd.gridCoords(current, width))
+        current = parents[current]
+    path.reverse()
+    return path
+
+def joinPaths(startParents, goalParents, meeting, width):
+    """
+    Joins the two halves of a bi-directional search at the node where they met
+    @return path: array of coords from start to goal
+    """
+    path = flatPath(startParents, gd.gridCoords(meeting, width), width)
+    current = goalParents[meeting]
+    while (current != -1):
+        path.append(gd.gridCoords(current, width))
+        current = goalParents[current]
+    return path
+
+def DFSSteps(grid, start, goal, budget=None):
+    """
+    Step-wise DFS, the same search as DFS but as a generator yielding one event per expanded node
+    @params same as DFS, budget: most nodes to expand (None for no limit)
+    @yield (node coords, frontier size, g, f) for every expanded node, f is g since there's no heuristic
+    @return (as the StopIteration value, see runSteps) True/False if a path exists or not (None if the budget ran out
+        first), order of nodes used to traverse path if one exists
+    """
+    return searchSteps(grid, start, goal, True, budget)
+
+def BFSSteps(grid, start, goal, budget=None):
+    """
+    Step-wise BFS, the same search as BFS but as a generator yielding one event per expanded node
+    @params, @yield and @return same as DFSSteps
+    """
+    return searchSteps(grid, start, goal, False, budget)
+
+def searchSteps(grid, start, goal, lifo=False, budget=None):
+    """
+    Generator form of searchKernel, also keeping each node's depth so the events can carry g
+    Nothing is kept about the search besides its own state, so the caller decides what to record. Stopping early is
+    just not asking for the next event (or calling close() on the generator)
+    @params same as searchKernel, budget: most nodes to expand (None for no limit)
+    @yield and @return same as DFSSteps
+    """
+    openCells, width, offsets = gd.flattenGrid(grid)
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    budget = math.inf if budget is None else budget
+    free = openCells
+    parents = [-1] * len(openCells)
+    depths = [0] * len(openCells)
+    frontier = deque([source])
+    pop = frontier.pop if lifo else frontier.popleft
+    free[source] = 0
+    expansions = 0
+    while (len(frontier) > 0):
+        if (expansions >= budget):
+            return None, None
+        current = pop()
+        expansions += 1
+        g = depths[current]
+        yield (gd.gridCoords(current, width), len(frontier), g, g)
+        if (current == target):
+            return True, flatPath(parents, goal, width)
+        for offset in offsets:
+            neighbour = current + offset
+            if (free[neighbour]):
+                free[neighbour] = 0
+                parents[neighbour] = current
+                depths[neighbour] = g + 1
+                frontier.append(neighbour)
+    return False, None
+
+def BDBFSSteps(grid, start, goal, budget=None):
+    """
+    Step-wise BDBFS, the same search as BDBFS but as a generator yielding one event per expanded node
+    Expansions alternate between the side growing from start and the side growing from goal, starting with start
+    @params same as BDBFS, budget: most nodes to expand over both sides (None for no limit)
+    @yield (node coords, size of both frontiers together, g, f) for every expanded node, g is the distance from the
+        end that side grows from, and f is g
+    @return same as DFSSteps
+    """
+    openCells, width, offsets = gd.flattenGrid(grid)
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    budget = math.inf if budget is None else budget
+    #one entry per side: (unvisited bitmap, closed bitmap, parents, frontier, depths)
+    forward = (bytearray(openCells), bytearray(len(openCells)), [-1] * len(openCells), deque([source]), [0] * len(openCells))
+    backward = (bytearray(openCells), bytearray(len(openCells)), [-1] * len(openCells), deque([target]), [0] * len(openCells))
+    forward[0][source] = backward[0][target] = 0
+    expansions = 0
+    side, other = forward, backward
+    #like BDBFS, both frontiers are checked before a forward step, and the backward step after it always happens
+    while (side is backward or (len(forward[3]) > 0 and len(backward[3]) > 0)):
+        if (expansions >= budget):
+            return None, None
+        free, closed, parents, frontier, depths = side
+        current = frontier.popleft()
+        closed[current] = 1
+        expansions += 1
+        g = depths[current]
+        yield (gd.gridCoords(current, width), len(forward[3]) + len(backward[3]), g, g)
+        if (other[1][current]):
+            return True, joinPaths(forward[2], backward[2], current, width)
+        for offset in offsets:
+            neighbour = current + offset
+            if (free[neighbour]):
+                free[neighbour] = 0
+                parents[neighbour] = current
+                depths[neighbour] = g + 1
+                frontier.append(neighbour)
+        side, other = other, side
     return False, None
 
-def aStar(grid, start, goal, heuristic, tieSort=False, fire=False, fireLimit=0, q=0, previousGrids={}):
+def aStarSteps(grid, start, goal, heuristic, tieSort=False, budget=None):
+    """
+    Step-wise A*, the same search as aStar (without fire) but as a generator yielding one event per expanded node
+    The frontier size in each event counts nodes that are really open, not stale heap entries
+    @params same as aStar, budget: most nodes to expand (None for no limit)
+    @yield (node coords, frontier size, g, f) for every expanded node
+    @return same as DFSSteps
+    """
+    openCells, width, offsets = gd.flattenGrid(grid)
+    moves = tuple(zip(offsets, ((0, -1), (-1, 0), (0, 1), (1, 0))))
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    budget = math.inf if budget is None else budget
+    hValues = h.flatField(heuristic, np.shape(grid), goal)
+    gVals = [math.inf] * len(openCells)
+    parents = [-1] * len(openCells)
+    closed = bytearray(len(openCells))
+    isOpen = bytearray(len(openCells))
+    gVals[source] = 0
+    isOpen[source] = 1
+    openCount = 1
+    frontier = [(0, 0, 0, 0, source)]
+    pushes = 1
+    expansions = 0
+    while (len(frontier) > 0):
+        f, _, _, g, current = heap.heappop(frontier)
+        if (g != gVals[current] or closed[current]): #stale entry
+            continue
+        if (expansions >= budget):
+            return None, None
+        closed[current] = 1
+        isOpen[current] = 0
+        openCount -= 1
+        expansions += 1
+        y, x = gd.gridCoords(current, width)
+        yield ((y, x), openCount, g, f)
+        if (current == target):
+            return True, flatPath(parents, goal, width)
+        currentG = g + 1
+        for offset, (dy, dx) in moves:
+            newIndex = current + offset
+            if (not openCells[newIndex] or currentG >= gVals[newIndex]):
+                continue
+            closed[newIndex] = 0
+            if (not isOpen[newIndex]):
+                isOpen[newIndex] = 1
+                openCount += 1
+            gVals[newIndex] = currentG
+            parents[newIndex] = current
+            estimate = hValues[newIndex] if hValues is not None else heuristic((y + dy, x + dx), goal)
+            heap.heappush(frontier, (currentG + estimate, -currentG if tieSort else 0, pushes, currentG, newIndex))
+            pushes += 1
+    return False, None
+
+def runSteps(steps):
+    """
+    Runs a step-wise search (DFSSteps, BFSSteps, BDBFSSteps or aStarSteps) to the end without keeping its events
+    @params steps: the generator
+    @return number of nodes expanded, the search's result (True/False/None, path)
+    """
+    expansions = 0
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return expansions, stop.value
+        expansions += 1
+
+def aStar(grid, start, goal, heuristic, tieSort=False, fire=False, fireLimit=0, q=0, previousGrids=None, stats=None, debug=True):
     """
     Runs an A* search from start to goal on the given grid
-    @params grid: selecte grid, start: starting coordinates, goal: goal coordinates
+    The open list is a lazy-deletion heap over flat indices: improving a node's g pushes a new entry and the old one
+    is skipped when it's popped, so a decrease-key is O(log n) instead of a scan and a heapify
+    Heuristics with a vectorized form are read from a cached field (see h.flatField) instead of being called per push
+    @params grid: selecte grid, start: starting coordinates, goal: goal coordinates, stats: same as DFS,
+        debug: False skips the explored node list, the frontier and the closed list, for callers that only want the
+        path and stats
     @return True/False if a path exists or not, order of nodes used to traverse path if one exists,
-    tuple containing output debug data (length closedList, list of explored nodes, frontier)
-    """
-    tieSort = tieSort #tieSort=True means that in the case of multiple nodes on the frontier with the same f value, we will sort and pick the most optimal
-    frontier = [] #open list
-    heap.heappush(frontier,(0,(start, None)))
-    closedList = dict()
-    gVals = dict() #list of g values (distance from start) for each node
-    gVals.update({start: 0})
-    current = start
+    tuple containing output debug data (length closedList, list of explored nodes, frontier), None if debug is False
+    """
+    since = st.clock(stats)
+    if (previousGrids is None):
+        previousGrids = dict()
+    #tieSort=True means that in the case of multiple nodes on the frontier with the same f value, we pick the one with the highest g
+    #this is encoded in the heap key as (f, -g, insertion order), so it costs nothing extra. Without it, ties go in insertion order
+    openCells, width, offsets = gd.flattenGrid(grid)
+    moves = tuple(zip(offsets, ((0, -1), (-1, 0), (0, 1), (1, 0)))) #flat offset and (y,x) step of each neighbour
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    hValues = h.flatField(heuristic, np.shape(grid), goal) #heuristic by flat index, None if it has no vectorized form
+    gVals = [math.inf] * len(openCells) #g values (distance from start) for each node
+    parents = [-1] * len(openCells)
+    closed = bytearray(len(openCells))
+    closedCount = 0
+    gVals[source] = 0
+    frontier = [(0, 0, 0, 0, source)] #open list of (f, tie key, insertion order, g, node)
+    pushes = 1
     exploredNodes = [] #list of node's we've added to closed list. This is different than the closed list because it keeps order, only for debugging purposes
+    expansions = 0
+    reopened = 0
+    tracking = stats is not None
+    largestFringe = 0
+    since = st.phase(stats, "setup", since)
     while (len(frontier) > 0): #while open list has elements
-        candidates = [heap.heappop(frontier)] #candidates is part of our tieSort
-        value, _ = candidates[0]
-        top = candidates[0]
-
-        if( tieSort and len(frontier) > 0): #if tieSort=True, and open list isn't empty
-            nextOnFrontierValue, _ = frontier[0]
-            i = 0
-            while (len(frontier) > 0 and value == nextOnFrontierValue and i < goal[0]): #load all elements on frontier with f equal to the first into candidates
-                candidates.append(heap.heappop(frontier))
-                i+= 1
-            top = max(candidates, key= lambda x: gVals.get(x[1][0]))
-            #^ this is our sorting algorithm: we weight g more heavily than h, so pick the max g. This will help us pick a path and stick too it for Manhattan distance, resulting in less expands, so long as f(x) doesn't change
-            candidates.remove(top)
-            while(len(candidates) > 0): #put the rest of the candidates back into the open list
-                heap.heappush(frontier, candidates[-1])
-                del candidates[-1]
-
-        _, (current, previous) = top
-        exploredNodes.append(current)
-        y, x = current
-        closedList.update({current: previous}) #add our selected node to the closed list
-        if (current == goal): #we've found the goal! return
-            return (True, makePath(start, goal, closedList), (len(closedList), exploredNodes, frontier, previousGrids))
-        #scan surrounding elements and add them to closed list
-        currentG = gVals.get(current) + 1 # this will be the g value for surrounding nodes
-
-        for newCoord in ( (y, x-1), (y-1, x), (y, x+1), (y+1, x) ): #scan up down left right
-            newY, newX = newCoord
-            allowedMove = scan(grid, (newY, newX))
-            if (fire): #if we're operating with fire, we have to scan and use our special fire rules (defined in part 4 of answer document)
-                allowedMove = scan(grid, (newY, newX), True, previousGrids, fireLimit, currentG, q)
-            if(allowedMove): #if the move is safe
-                if (newCoord in [k for _, (k, _) in frontier]): #if discovered node is already in open list
-                    if(gVals.get(newCoord) > currentG): #in case of admissible but not consistent heuristic, if node's g is greater than other's g
-                        oldIndex = [z for _, (z, _) in frontier].index(newCoord)
-                        frontier[oldIndex] = (currentG + heuristic(newCoord, goal), (newCoord, current))
-                        heap.heapify(frontier)
-                        gVals.update({newCoord: currentG})
-                elif (newCoord in closedList): #in case of admissible but not consistent heuristic, if node is already in closed list
-                    if(gVals.get(newCoord) > currentG): #if node's g is greater than other's g
-                        closedList.pop(newCoord)
-                        heap.heappush(frontier,(currentG + heuristic(newCoord, goal),(newCoord, current)))
-                        gVals.update({newCoord: currentG})
-                else: #if undiscovered thus far
-                    heap.heappush(frontier,(currentG + heuristic(newCoord, goal),(newCoord, current)))
-                    gVals.update({newCoord: currentG})
-    return False, None, (closedList, exploredNodes, frontier) #this will be reached if frontier list runs out of elements
+        if (tracking and len(frontier) > largestFringe):
+            largestFringe = len(frontier)
+        _, _, _, g, current = heap.heappop(frontier)
+        if (g != gVals[current] or closed[current]): #stale entry, this node has been pushed again with a better g
+            continue
+        closed[current] = 1 #add our selected node to the closed list
+        closedCount += 1
+        expansions += 1
+        y, x = gd.gridCoords(current, width)
+        if (debug):
+            exploredNodes.append((y, x))
+        if (current == target): #we've found the goal! return
+            since = st.record(stats, since, expansions, pushes, largestFringe, reopened, pushes - 1 if hValues is None else 0)
+            path = flatPath(parents, goal, width)
+            st.phase(stats, "path", since)
+            if (not debug):
+                return True, path, None
+            return (True, path, (closedCount, exploredNodes, openList(frontier, gVals, parents, width), previousGrids))
+        currentG = g + 1 # this will be the g value for surrounding nodes
+        if (fire): #if we're operating with fire, we have to use our special fire rules (defined in part 4 of answer document)
+            fireGrid = generateFireGrids(previousGrids, grid, currentG, q)
+
+        for offset, (dy, dx) in moves: #scan up down left right
+            newIndex = current + offset
+            if (not openCells[newIndex] or currentG >= gVals[newIndex]): #blocked, or already reached at least as cheaply
+                continue
+            newCoord = (y + dy, x + dx)
+            if (fire and fireGrid[newCoord[0]][newCoord[1]] > fireLimit): #if node's probabilty of being on fire is greater than our threshold
+                continue
+            if (closed[newIndex]): #in case of admissible but not consistent heuristic, a closed node can be reopened
+                closed[newIndex] = 0
+                closedCount -= 1
+                reopened += 1
+            gVals[newIndex] = currentG
+            parents[newIndex] = current
+            estimate = hValues[newIndex] if hValues is not None else heuristic(newCoord, goal)
+            heap.heappush(frontier, (currentG + estimate, -currentG if tieSort else 0, pushes, currentG, newIndex))
+            pushes += 1
+    st.record(stats, since, expansions, pushes, largestFringe, reopened, pushes - 1 if hValues is None else 0)
+    if (not debug):
+        return False, None, None
+    closedList = {gd.gridCoords(i, width): (gd.gridCoords(parents[i], width) if parents[i] != -1 else None) for i in range(len(closed)) if closed[i]}
+    return False, None, (closedList, exploredNodes, []) #this will be reached if frontier list runs out of elements
+
+def ARAStar(grid, start, goal, heuristic, weight=3, step=0.5, budget=None, timeLimit=None, tieSort=False, stats=None):
+    """
+    Runs an anytime weighted A* (ARA*) search from start to goal on the given grid
+    The first search orders the open list by g + weight * h, which finds a path quickly. Then weight is lowered by
+    step and the search picks up where it left off: the open list is re-sorted with the new weight, and nodes whose g
+    improved after they were closed (kept aside instead of being reopened) are put back on it, so nodes are only
+    expanded again when the earlier search actually left them inconsistent. Every solution comes with a proven
+    bound: its cost is at most bound times the shortest path, where bound = min(weight, cost / lowest g + h left on
+    the open list). With an admissible heuristic the last solution has bound 1 and is a shortest path
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates, heuristic: admissible heuristic,
+        weight: starting heuristic weight, step: how much weight drops after each solution,
+        budget: most nodes to expand in total (None for no limit), timeLimit: most seconds to search (None for no limit),
+        tieSort: same as aStar, stats: same as DFS, every node put back on the open list in a new round counts as reopened
+    @return True/False if a path was found within the limits, best path found,
+    tuple containing output debug data (bound of the best path, list of (weight, bound, path) for every solution, nodes expanded)
+    """
+    since = st.clock(stats)
+    deadline = math.inf if timeLimit is None else perf_counter() + timeLimit
+    openCells, width, offsets = gd.flattenGrid(grid)
+    moves = tuple(zip(offsets, ((0, -1), (-1, 0), (0, 1), (1, 0))))
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    budget = math.inf if budget is None else budget
+    gVals = [math.inf] * len(openCells)
+    hVals = h.flatField(heuristic, np.shape(grid), goal) #heuristic values, from the field if there is one
+    if (hVals is None): #otherwise filled in the first time a node is reached
+        hVals = [-1] * len(openCells)
+    parents = [-1] * len(openCells)
+    closed = [0] * len(openCells) #the search round a node was last expanded in, so a new round needs no clearing
+    inconsistent = [] #nodes improved after being closed this round
+    gVals[source] = 0
+    heuristicCalls = 0
+    if (hVals[source] < 0):
+        hVals[source] = heuristic(start, goal)
+        heuristicCalls += 1
+    frontier = [(weight * hVals[source], 0, 0, 0, source)] #open list of (g + weight * h, tie key, insertion order, g, node)
+    pushes = 1
+    totalPushes = 0 #pushes of the rounds before this one
+    reopened = 0
+    tracking = stats is not None
+    largestFringe = 0
+    expansions = 0
+    solutions = []
+    searchRound = 1
+    since = st.phase(stats, "setup", since)
+    while True:
+        while (len(frontier) > 0):
+            if (tracking and len(frontier) > largestFringe):
+                largestFringe = len(frontier)
+            _, _, _, g, current = frontier[0]
+            if (g != gVals[current] or closed[current] == searchRound): #stale entry
+                heap.heappop(frontier)
+                continue
+            if (gVals[target] <= frontier[0][0]): #nothing left on the open list can improve the goal at this weight
+                break
+            if (expansions >= budget or perf_counter() >= deadline):
+                st.record(stats, since, expansions, totalPushes + pushes, largestFringe, reopened, heuristicCalls)
+                return (len(solutions) > 0, solutions[-1][2] if solutions else None, (solutions[-1][1] if solutions else math.inf, solutions, expansions))
+            heap.heappop(frontier)
+            closed[current] = searchRound
+            expansions += 1
+            currentG = g + 1
+            y, x = gd.gridCoords(current, width)
+            for offset, (dy, dx) in moves:
+                newIndex = current + offset
+                if (not openCells[newIndex] or currentG >= gVals[newIndex]):
+                    continue
+                gVals[newIndex] = currentG
+                parents[newIndex] = current
+                if (hVals[newIndex] < 0):
+                    hVals[newIndex] = heuristic((y + dy, x + dx), goal)
+                    heuristicCalls += 1
+                if (closed[newIndex] == searchRound): #don't reopen within a round, fix it in the next one
+                    inconsistent.append(newIndex)
+                    continue
+                heap.heappush(frontier, (currentG + weight * hVals[newIndex], -currentG if tieSort else 0, pushes, currentG, newIndex))
+                pushes += 1
+        if (gVals[target] == math.inf): #the open list ran dry without reaching the goal
+            st.record(stats, since, expansions, totalPushes + pushes, largestFringe, reopened, heuristicCalls)
+            return False, None, (math.inf, solutions, expansions)
+
+        #everything that could still be improved: the live open list plus the inconsistent nodes
+        pending = {node for _, _, _, g, node in frontier if g == gVals[node] and closed[node] != searchRound}
+        pending.update(inconsistent)
+        lowest = min((gVals[node] + hVals[node] for node in pending), default=math.inf)
+        bound = max(1, min(weight, gVals[target] / lowest)) if lowest > 0 else 1
+        if (not solutions or bound < solutions[-1][1] or gVals[target] < len(solutions[-1][2]) - 1):
+            solutions.append((weight, bound, flatPath(parents, goal, width)))
+        if (bound <= 1):
+            st.record(stats, since, expansions, totalPushes + pushes, largestFringe, reopened, heuristicCalls)
+            return True, solutions[-1][2], (1, solutions, expansions)
+        #next round: lower weight, re-sort the open list and put the inconsistent nodes back on it
+        weight = max(1, weight - step)
+        searchRound += 1
+        totalPushes += pushes
+        reopened += len(inconsistent)
+        inconsistent = []
+        frontier = [(gVals[node] + weight * hVals[node], -gVals[node] if tieSort else 0, i, gVals[node], node) for i, node in enumerate(pending)]
+        heap.heapify(frontier)
+        pushes = len(frontier)
+
+def JPS(grid, start, goal, heuristic, tieSort=False, stats=None, debug=True):
+    """
+    Runs a Jump Point Search from start to goal on the given grid, which is A* over jump points only
+    On a 4-connected grid every shortest path can be rearranged so that it only turns from horizontal to vertical
+    where it's forced to (the cell it could have turned at one step earlier is blocked), and turns from vertical to
+    horizontal anywhere. So a horizontal jump runs until it hits a forced turn or the goal, and a vertical jump stops
+    at any cell whose horizontal jumps find something. Every other cell on the way is skipped without being expanded
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates, stats, debug: same as aStar
+    @return True/False if a path exists or not, order of nodes used to traverse path if one exists,
+    tuple containing output debug data (length closedList, list of explored nodes, frontier), same as aStar
+    """
+    since = st.clock(stats)
+    openCells, width, offsets = gd.flattenGrid(grid)
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    hValues = h.flatField(heuristic, np.shape(grid), goal)
+    gVals = [math.inf] * len(openCells)
+    parents = [-1] * len(openCells)
+    arrivals = bytearray(len(openCells)) #bitmask of directions a node was reached from at its best g
+    closed = bytearray(len(openCells))
+    closedCount = 0
+    gVals[source] = 0
+    arrivals[source] = 15 #the start can go anywhere
+    frontier = [(0, 0, 0, 0, source)] #open list of (f, tie key, insertion order, g, node), same as aStar
+    pushes = 1
+    exploredNodes = []
+    expansions = 0
+    reopened = 0
+    tracking = stats is not None
+    largestFringe = 0
+    since = st.phase(stats, "setup", since)
+    while (len(frontier) > 0):
+        if (tracking and len(frontier) > largestFringe):
+            largestFringe = len(frontier)
+        _, _, _, g, current = heap.heappop(frontier)
+        if (g != gVals[current] or closed[current]): #stale entry
+            continue
+        closed[current] = 1
+        closedCount += 1
+        expansions += 1
+        if (debug):
+            exploredNodes.append(gd.gridCoords(current, width))
+        if (current == target):
+            since = st.record(stats, since, expansions, pushes, largestFringe, reopened, pushes - 1 if hValues is None else 0)
+            path = jumpPath(parents, target, width)
+            st.phase(stats, "path", since)
+            if (not debug):
+                return True, path, None
+            return (True, path, (closedCount, exploredNodes, openList(frontier, gVals, parents, width), dict()))
+
+        for bit, step in enumerate(jumpDirections(openCells, current, arrivals[current], width)):
+            if (not step):
+                continue
+            jumpPoint = jump(openCells, current, step, width, target)
+            if (jumpPoint == -1):
+                continue
+            newG = g + abs(jumpPoint - current) // abs(step)
+            if (newG < gVals[jumpPoint]):
+                arrivals[jumpPoint] = 1 << bit
+            elif (newG == gVals[jumpPoint] and not arrivals[jumpPoint] & 1 << bit):
+                #reached as cheaply from a new direction, which may allow turns the first arrival didn't
+                arrivals[jumpPoint] |= 1 << bit
+                if (not closed[jumpPoint]):
+                    continue
+            else:
+                continue
+            if (closed[jumpPoint]):
+                closed[jumpPoint] = 0
+                closedCount -= 1
+                reopened += 1
+            gVals[jumpPoint] = newG
+            parents[jumpPoint] = current
+            estimate = hValues[jumpPoint] if hValues is not None else heuristic(gd.gridCoords(jumpPoint, width), goal)
+            heap.heappush(frontier, (newG + estimate, -newG if tieSort else 0, pushes, newG, jumpPoint))
+            pushes += 1
+    st.record(stats, since, expansions, pushes, largestFringe, reopened, pushes - 1 if hValues is None else 0)
+    if (not debug):
+        return False, None, None
+    closedList = {gd.gridCoords(i, width): (gd.gridCoords(parents[i], width) if parents[i] != -1 else None) for i in range(len(closed)) if closed[i]}
+    return False, None, (closedList, exploredNodes, [])
+
+def jumpDirections(openCells, node, arrivals, width):
+    """
+    Pruned set of directions to jump in from a node, given the directions it was reached from
+    @return flat steps ordered left, up, right, down, 0 for a direction that's pruned
+    """
+    left = up = right = down = 0
+    if (arrivals == 15): #start node
+        return (-1, -width, 1, width)
+    if (arrivals & 0b0101): #reached horizontally: keep going, and turn vertically only if forced
+        for step in ((-1,) if arrivals & 1 else ()) + ((1,) if arrivals & 4 else ()):
+            if (step == -1):
+                left = -1
+            else:
+                right = 1
+            if (openCells[node - width] and not openCells[node - step - width]):
+                up = -width
+            if (openCells[node + width] and not openCells[node - step + width]):
+                down = width
+    if (arrivals & 0b1010): #reached vertically: keep going, or turn either way
+        left = -1
+        right = 1
+        if (arrivals & 2):
+            up = -width
+        if (arrivals & 8):
+            down = width
+    return (left, up, right, down)
+
+def jump(openCells, node, step, width, target):
+    """
+    Moves from node in a straight line until reaching a jump point
+    @return flat index of the jump point, or -1 if the line runs into a wall first
+    """
+    if (step == 1 or step == -1):
+        while True:
+            node += step
+            if (not openCells[node]):
+                return -1
+            if (node == target):
+                return node
+            if ((openCells[node - width] and not openCells[node - step - width]) or (openCells[node + width] and not openCells[node - step + width])):
+                return node #forced turn
+    while True:
+        node += step
+        if (not openCells[node]):
+            return -1
+        if (node == target or jump(openCells, node, 1, width, target) != -1 or jump(openCells, node, -1, width, target) != -1):
+            return node
+
+def jumpPath(parents, target, width):
+    """
+    Expands the jump points of a JPS search into the full path of cells
+    @return path: array of coords from start to goal
+    """
+    jumpPoints = []
+    current = target
+    while (current != -1):
+        jumpPoints.append(current)
+        current = parents[current]
+    jumpPoints.reverse()
+    path = [gd.gridCoords(jumpPoints[0], width)]
+    for previous, current in zip(jumpPoints, jumpPoints[1:]):
+        step = 1 if abs(current - previous) < width else width
+        step = step if current > previous else -step
+        path.extend(gd.gridCoords(node, width) for node in range(previous + step, current + step, step))
+    return path
+
+def openList(frontier, gVals, parents, width):
+    """
+    Converts the live entries of a lazy-deletion open list back into (f, (coords, previous coords)) pairs for debugging
+    """
+    return [(f, (gd.gridCoords(node, width), gd.gridCoords(parents[node], width) if parents[node] != -1 else None))
+        for f, _, _, g, node in frontier if g == gVals[node]]
 
 def scan(grid, coords, fire=False, previousGrids={}, fireLimit=0, g=-1, q=0):
     """
@@ -305,7 +1082,7 @@ def generateFireGrids(previousGrids, grid, g, q):
         return previousGrids[g]
     if (g-1 not in previousGrids):
         fireGrid = generateFireGrids(previousGrids, grid, g-1, q)
-    fireGrid = gd.grid_copy(previousGrids[g-1])
+    fireGrid = np.array(previousGrids[g-1], dtype=float) #probabilities, so unlike the grid itself this can't be CELL_TYPE
     for i in range(len(fireGrid)):
         for j in range(len(fireGrid)):
             fireGrid[i][j] = fireScan(previousGrids[g-1], (i, j), q) #get and set the value of the current node from fireScan
@@ -329,25 +1106,44 @@ def fireScan(grid, coords, q):
             value = value + (1 - value) * (1 - (1 - q)) * grid[i][j]
             #chance a node is on fire is the chance that it was already on fire + chance that it wasn't * likelihood that the node next to it is * chance it catches on fire if the node next to it is
     return value
-def fireEval(grid, path, q):
+def fireEval(grid, path, q, incremental=True, stats=None):
     """
     This is the function we use to run A* through the fire grid
-    @params grid: starting grid, path: the path our initial A* gave us, q
+    The runner follows path while the fire spreads one step per move. When the next cell is on fire it replans from
+    where it's standing and keeps going, the fire isn't restarted
+    With incremental=True replanning is D* Lite (see incremental.py): the planner is told which cells catch fire after
+    every step and only repairs what they changed, so a replan costs about the size of the change, not the grid.
+    With incremental=False every replan is a fresh fire aware A*, like before
+    @params grid: starting grid, path: the path our initial A* gave us, q, incremental: replan with D* Lite or A*,
+        stats: optional collector from st.newStats that every replan reports to
     @return True/False, whether our runner survived or not, the last grid it was in (for testing purposes)
     """
-    evalGrid = gd.grid_copy(grid)
-    for i in range(len(path)): #for every node in path
-        current = path[i]
-        y, x = current
+    evalGrid = np.array(grid, dtype=gd.CELL_TYPE) #a copy, so the caller's grid doesn't burn
+    dimm = len(evalGrid)
+    goal = (dimm - 1, dimm - 1)
+    if (incremental):
+        planner = inc.newPlanner(evalGrid, path[0], goal)
+    path = list(path)
+    i = 0
+    while (i < len(path)): #for every node in path
+        y, x = path[i]
         if (evalGrid[y][x] == gd.FIRE): #if node is on fire
-            #rerun A* from last safe node looking for an alternative route
-            dimm = len(evalGrid)
-            solved, newPath, _ = aStar(evalGrid, path[i-1], (dimm - 1, dimm - 1), h.Manhattan, False, True, 0.9, q)
-            if (solved):
-                return fireEval(grid, newPath, q) #if A* finds a new path, take it
+            if (i == 0): #nowhere to replan from
+                return False, evalGrid
+            #replan from last safe node looking for an alternative route
+            if (incremental):
+                solved, newPath = inc.replan(planner, path[i-1], stats)
             else:
+                #the goal's distance field is cached, so every replan on this grid reuses the same exact heuristic
+                solved, newPath, _ = aStar(evalGrid, path[i-1], goal, h.DistanceField(evalGrid, goal), False, True, 0.9, q, stats=stats, debug=False)
+            if (not solved):
                 return False, evalGrid #no path was found, A* can't help you
-        evalGrid = fireAdvance(evalGrid, q) #advance grid to next state
+            path = path[:i-1] + newPath #take the new path from where we are, without moving this step
+            continue
+        evalGrid, caught = fireStep(evalGrid, q) #advance grid to next state
+        if (incremental):
+            inc.burnCells(planner, caught)
+        i += 1
     return True, evalGrid
 
 def fireAdvance(grid, q):
@@ -356,18 +1152,28 @@ def fireAdvance(grid, q):
     @params grid: given grid, q
     @return grid at next timestep
     """
-    nextGrid = gd.grid_copy(grid)
-    for i in range(len(nextGrid)):
-        for j in range(len(nextGrid)):
-            if(nextGrid[i][j] != gd.FIRE and nextGrid[i][j] != gd.BLOCKED): #if cell isn't already on fire or blocked
-                surrounding = 0
-                for y,x in [(i+1,j), (i-1,j), (i,j+1), (i,j-1)]: #for each surrounding node
-                    if ( scan(grid, (y,x)) and  grid[y][x] == gd.FIRE): #if surrounding node is on fire
-                        surrounding += 1
-                if (random.random() < (1 - math.pow(1 - q, surrounding))): #if chance of catching fire is higher than random.random() (0,1)
-                    nextGrid[i][j] = gd.FIRE #put node on fire
+    nextGrid, _ = fireStep(grid, q)
     return nextGrid
 
+def fireStep(grid, q):
+    """
+    One step of fireAdvance, also reporting which cells caught fire
+    Only cells next to the fire can catch, so burning neighbours are counted for the whole grid at once and random
+    numbers are only drawn for the cells along the fire front
+    @params grid: given grid, q
+    @return grid at next timestep, list of [y, x] coordinates that caught fire
+    """
+    grid = np.asarray(grid)
+    burning = np.pad(grid == gd.FIRE, 1).astype(np.int8)
+    surrounding = burning[2:, 1:-1] + burning[:-2, 1:-1] + burning[1:-1, 2:] + burning[1:-1, :-2] #burning neighbours of each cell
+    nextGrid = gd.grid_copy(grid)
+    caught = []
+    for i, j in np.argwhere((grid != gd.FIRE) & (grid != gd.BLOCKED) & (surrounding > 0)).tolist(): #if cell isn't already on fire or blocked
+        if (random.random() < (1 - math.pow(1 - q, surrounding[i, j]))): #if chance of catching fire is higher than random.random() (0,1)
+            nextGrid[i][j] = gd.FIRE #put node on fire
+            caught.append((i, j))
+    return nextGrid, caught
+
 """
 Please note:
 Everything below here is testing/data generation data.
@@ -516,17 +1322,17 @@ def testFive():
             upperRight = (0, dimm - 1)
             p = 0.2
             goal = (dimm-1, dimm-1)
-            heuristic = h.Manhattan
             grid = gd.generateFireGrid(dimm, p)
+            heuristic = h.DistanceField(grid, goal)
             #print(grid)
             previousFireGrids = dict()
             #solvedStrong, solvedPath, testingData = aStar(grid, start, goal, heuristic, False, True, thresh, q)
-            solved, _ = BDBFS(grid, start, goal)
-            fireHasPath, _ = BDBFS(grid, bottomLeft, upperRight)
+            solved = gd.isSolvable(grid, start, goal)
+            fireHasPath = gd.isSolvable(grid, bottomLeft, upperRight)
             if (solved and fireHasPath):
                 listings = [i for i in np.arange(0,1.05,0.05)]
                 for i in listings:
-                    _, solvedPath, testData = aStar(grid, start, goal, h.Manhattan, False, True, i, q, previousFireGrids)
+                    _, solvedPath, testData = aStar(grid, start, goal, heuristic, False, True, i, q, previousFireGrids)
                     if (solvedPath):
                         _, _, _, previousFireGrids = testData
                         #print(listings)
@@ -547,14 +1353,15 @@ def testSix():
         count[h.returnZero.__name__] = 0
         count[h.Manhattan.__name__] = 0
         count[h.Euc.__name__] = 0
+        count[h.ALT.__name__] = 0
         numSolved = 0
-        while (numSolved < 3 * runs):
+        while (numSolved < 4 * runs):
             dimm = 100
             start = (0,0)
             goal = (dimm-1,dimm-1)
             grid = gd.generateFireGrid(dimm, p)
-            solved, _ = BDBFS(grid, start, goal)
-            for heuristic in [h.returnZero, h.Manhattan, h.Euc]:
+            solved = gd.isSolvable(grid, start, goal)
+            for heuristic in [h.returnZero, h.Manhattan, h.Euc, h.ALT(grid)]:
                 if(solved):
                     solved, solvedPath, testingData = aStar(grid, start, goal, heuristic, True)
                     if (heuristic == h.returnZero):
@@ -562,13 +1369,13 @@ def testSix():
                     numSolved += 1
                     closedLen, *_ = testingData
                     count[heuristic.__name__] += closedLen
-        print(math.ceil(p * 100) / 100, " : ", math.floor(count[h.returnZero.__name__]/runs), math.floor(count[h.Manhattan.__name__]/runs), math.floor(count[h.Euc.__name__]/runs))
+        print(math.ceil(p * 100) / 100, " : ", math.floor(count[h.returnZero.__name__]/runs), math.floor(count[h.Manhattan.__name__]/runs), math.floor(count[h.Euc.__name__]/runs), math.floor(count[h.ALT.__name__]/runs))
 
 def testSeven():
     hardestMaze = hardestAStarMaze(50)
-    _, path, info = aStarManhattan(hardestMaze, (0, 0), (49, 49))
-    _, explored, _ = info
-    expansionSize = len(explored)
+    stats = st.newStats()
+    _, path, _ = aStarManhattan(hardestMaze, (0, 0), (49, 49), stats, False)
+    expansionSize = stats["expansions"]
     for y, x in path:
         hardestMaze[y][x] = 3
     pyplot.matshow(hardestMaze)
@@ -9,17 +9,20 @@ def plotSearchAlgorithms(dim, p):
     goal = (dim-1, dim-1)
     grid = gd.generateGrid(dim, p)
 
-    solved = [False for _ in range(5)]
+    solved = [False for _ in range(7)]
 
-    solved[0], DFSPath = algos.DFS(grid, start, goal)
+    solved[0], DFSPath, _ = algos.DFS(grid, start, goal)
     solved[1], BFSPath, _ = algos.BFS(grid, start, goal)
     solved[2], BDBFSPath = algos.BDBFS(grid, start, goal)
     solved[3], AStarPathEuclidean, _ = algos.aStar(grid, start, goal, h.Euc)
     solved[4], AStarPathManhattan, _ = algos.aStar(grid, start, goal, h.Manhattan)
+    solved[5], JPSPath, _ = algos.JPS(grid, start, goal, h.Manhattan)
+    solved[6], BDAStarPath = algos.BDAStar(grid, start, goal, h.Manhattan)
 
     paths = {
         "DFS": DFSPath, "BFS": BFSPath, "BDBFS": BDBFSPath,
-        "A* Euclidean": AStarPathEuclidean, "A* Manhattan": AStarPathManhattan
+        "A* Euclidean": AStarPathEuclidean, "A* Manhattan": AStarPathManhattan, "JPS": JPSPath,
+        "Bi-directional A*": BDAStarPath
     }
 
     # if solvable, then all search algorithms should work, and so plot all of them one at a time
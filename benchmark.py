@@ -0,0 +1,163 @@
+import algorithms as algo
+import heuristics as h
+import grid as gd
+import stats as st
+import wavefront as wf
+import numpy as np
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from time import perf_counter
+
+dims = (50, 200, 500, 1000, 2000)
+densities = (0.1, 0.2, 0.3)
+searches = { #debug=False everywhere it exists, so no explored node lists are built while timing
+    "DFS": lambda grid, start, goal, stats: algo.DFS(grid, start, goal, stats),
+    "BFS": lambda grid, start, goal, stats: algo.BFS(grid, start, goal, stats, False),
+    "BDBFS": lambda grid, start, goal, stats: algo.BDBFS(grid, start, goal, stats),
+    "A* returnZero": lambda grid, start, goal, stats: algo.aStar(grid, start, goal, h.returnZero, stats=stats, debug=False),
+    "A* Euc": lambda grid, start, goal, stats: algo.aStar(grid, start, goal, h.Euc, stats=stats, debug=False),
+    "A* Manhattan": lambda grid, start, goal, stats: algo.aStar(grid, start, goal, h.Manhattan, stats=stats, debug=False),
+}
+
+def main():
+    """
+    python benchmark.py results.json [baseline.json]
+    Runs the whole suite, writes the results, and if a baseline is given exits with 1 when anything regressed
+    """
+    results = runSuite()
+    writeResults(sys.argv[1] if len(sys.argv) > 1 else "benchmark.json", results)
+    if (len(sys.argv) > 2):
+        with open(sys.argv[2]) as f:
+            regressions = compareResults(results, json.load(f))
+        for line in regressions:
+            print("REGRESSION", line)
+        if (regressions):
+            sys.exit(1)
+
+def runSuite(dims=dims, densities=densities, searches=searches, seed=520, corpusDir="corpora", repeats=3):
+    """
+    Runs every search on every grid of a fixed corpus for each (dimm, p)
+    Corpora are written to corpusDir the first time (see benchmarkCorpus) and reused after that, so every run and
+    every machine searches the same grids
+    @params dims, densities: grid sizes and blocking probabilities, searches: dict of name -> function taking
+        (grid, start, goal, stats), seed: seed of the whole suite, corpusDir: where corpora are kept,
+        repeats: timed runs per grid, the fastest one is kept
+    @return dict with "meta" (machine and suite settings) and "results" (one entry per search, dimm and p: total time
+        in seconds, total expansions, largest fringe, largest traced memory in bytes, grids solved)
+    """
+    results = []
+    for dimm in dims:
+        for p in densities:
+            path = benchmarkCorpus(corpusDir, dimm, p, seed)
+            _, grids = gd.openCorpus(path)
+            for name, search in searches.items():
+                results.append(dict({"search": name, "dimm": dimm, "p": p}, **benchmarkSearch(search, grids, repeats)))
+                print(name, dimm, p, results[-1], flush=True)
+    meta = {"seed": seed, "repeats": repeats, "python": platform.python_version(), "numpy": np.__version__,
+        "machine": platform.machine(), "processor": platform.processor()}
+    return {"meta": meta, "results": results}
+
+def benchmarkCorpus(corpusDir, dimm, p, seed):
+    """
+    Path of the corpus for (dimm, p), written if it doesn't exist yet
+    Smaller grids get more copies, so their times are long enough to measure (40 grids of 50 x 50, 2 of 2000 x 2000).
+    Unsolvable grids are repaired with gd.carveCorridor, so searches are timed on reaching the goal
+    The suite seed is part of the file name, so another seed never reuses these grids. The corpus is built under a
+    temporary name and only renamed once it's carved, so an interrupted run can't leave a half finished corpus behind
+    """
+    path = os.path.join(corpusDir, "mazes-" + str(dimm) + "-" + str(p) + "-" + str(seed) + ".maze")
+    if (os.path.exists(path)):
+        return path
+    os.makedirs(corpusDir, exist_ok=True)
+    corpusSeed = int(np.random.SeedSequence([seed, dimm, round(p * 1000)]).generate_state(1)[0])
+    partial = path + ".partial"
+    gd.generateCorpus(partial, max(2, 2000 // dimm), dimm, p, corpusSeed, metadata={"carved": True, "suiteSeed": seed})
+    _, grids = gd.openCorpus(partial, writable=True)
+    rng = np.random.default_rng(corpusSeed)
+    for i in np.flatnonzero(~gd.isSolvable(grids)):
+        gd.carveCorridor(grids[i], rng)
+    grids.flush()
+    del grids #close the memory map before the file is renamed
+    os.replace(partial, path)
+    return path
+
+def benchmarkSearch(search, grids, repeats=3):
+    """
+    Times one search over a stack of grids, then runs it once more on the first grid under tracemalloc for its peak
+    memory (tracing slows everything down, so it's kept out of the timed runs, and every grid of a corpus is the same size)
+    The heuristic field and distance field caches are emptied before every run, so both the times and the memory
+    include building the heuristic, rather than depending on what earlier runs left in the caches
+    @return dict with time, expansions, peakFringe, peakMemory and solved
+    """
+    dimm = grids.shape[1]
+    start, goal = (0, 0), (dimm - 1, dimm - 1)
+    stats = st.newStats()
+    total = 0
+    solved = 0
+    for grid in grids:
+        grid = np.array(grid) #out of the memory map, so the first run doesn't pay for reading it from disk
+        best = float("inf")
+        for run in range(repeats):
+            runStats = st.newStats() if run == 0 else None
+            clearCaches()
+            began = perf_counter()
+            result = search(grid, start, goal, runStats)
+            best = min(best, perf_counter() - began)
+            if (run == 0):
+                solved += bool(result[0])
+                stats["expansions"] += runStats["expansions"]
+                stats["peakFringe"] = max(stats["peakFringe"], runStats["peakFringe"])
+        total += best
+    grid = np.array(grids[0])
+    clearCaches()
+    tracemalloc.start()
+    search(grid, start, goal, None)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"time": total, "expansions": stats["expansions"], "peakFringe": stats["peakFringe"],
+        "peakMemory": peakMemory, "solved": solved}
+
+def clearCaches():
+    """
+    Empties the module level caches searches fill in: heuristic fields and distance fields
+    """
+    h.flatFields.clear()
+    wf.clearDistanceFields()
+
+def writeResults(filename, results):
+    """
+    Writes the output of runSuite as JSON
+    """
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=1)
+
+def compareResults(results, baseline, timeTolerance=0.2, memoryTolerance=0.2, timeFloor=0.01):
+    """
+    Compares results with a baseline from an earlier runSuite, matching entries on search, dimm and p
+    Expansions and peak fringe are exact for a given corpus, so any increase is a regression. Time and memory are
+    noisy, so they're only flagged past a relative tolerance, and times below timeFloor seconds aren't compared
+    @params results, baseline: outputs of runSuite, timeTolerance, memoryTolerance: allowed relative increase,
+        timeFloor: seconds below which a time is too short to compare
+    @return list of regressions as readable strings, empty if there are none
+    """
+    old = {(entry["search"], entry["dimm"], entry["p"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results["results"]:
+        key = (entry["search"], entry["dimm"], entry["p"])
+        if (key not in old):
+            continue
+        before = old[key]
+        name = entry["search"] + " " + str(entry["dimm"]) + " p=" + str(entry["p"]) + ": "
+        for field in ("expansions", "peakFringe"):
+            if (entry[field] > before[field]):
+                regressions.append(name + field + " " + str(before[field]) + " -> " + str(entry[field]))
+        if (max(entry["time"], before["time"]) >= timeFloor and entry["time"] > before["time"] * (1 + timeTolerance)):
+            regressions.append(name + "time " + str(round(before["time"], 4)) + "s -> " + str(round(entry["time"], 4)) + "s")
+        if (entry["peakMemory"] > before["peakMemory"] * (1 + memoryTolerance)):
+            regressions.append(name + "peakMemory " + str(before["peakMemory"]) + " -> " + str(entry["peakMemory"]))
+    return regressions
+
+if(__name__ == "__main__"): main()
@@ -1,6 +1,8 @@
 import algorithms as algo
 import heuristics as h
 import grid as gd
+import wavefront as wf
+import percolation as pc
 import math
 import random as rand
 import sys
@@ -9,18 +11,15 @@ import numpy as np
 def main():
     graphDimVsSolv()
 
-def graphDimVsSolv():
+def graphDimVsSolv(seed=None):
     start = (0,0)
     goal = (99,99)
     runs = 1000
     p = 0.05
     upper = 50
     min = 2 #const
-    count = 0
-    for _ in range (runs):
-        grid = gd.generateGrid(100, 0.3)
-        solved, *rest = algo.BDBFS(grid, start, goal) #, h.Manhattan)
-        if(solved): count+= 1
+    solved, lengths = wf.wavefrontBFS(gd.generateGrids(runs, 100, 0.3, seed), start, goal)
+    count = np.count_nonzero(solved)
     """
     solveCount = [0 for _ in range(upper - min + 1)]
     print(len(solveCount))
@@ -30,18 +29,113 @@ def graphDimVsSolv():
         f.write(str(i) + "\t")
         for p in np.arange(0, 0.5, 0.05):
             solveCount[i-min][p] = 0
-            for _ in range(runs):
-                dimm = i
-                start = (0,0)
-                goal = (dimm-1,dimm-1)
-                grid = gd.generateGrid(dimm, p)
-                solved, *rest = algo.BDBFS(grid, start, goal) #, h.Manhattan)
-                if(solved):
-                    solveCount[i-min][p] += 1
+            dimm = i
+            start = (0,0)
+            goal = (dimm-1,dimm-1)
+            solved, lengths = wf.wavefrontBFS(gd.generateGrids(runs, dimm, p, seed), start, goal)
+            solveCount[i-min][p] = np.count_nonzero(solved)
             print("Finished", i, "with a rate of", solveCount[i-min][p]/runs)
             f.write(str(solveCount[i-min][p]/runs) + "\t")
         f.write("\n")
         """
-    print(count/runs)
+    print(count/runs, lengths[solved].mean() if count else None)
+
+def graphDimVsSolvPercolation(filename, upper=50, samples=1000, seed=None):
+    """
+    Writes the same dim x p solvability table as graphDimVsSolv, but every row comes from one set of Newman-Ziff
+    samples, which gives the whole curve over p at once instead of fresh grids for every p
+    """
+    min = 2 #const
+    seeds = np.random.SeedSequence(seed).spawn(upper - min + 1)
+    f = open(filename, "a+")
+    for i in range(min, upper + 1):
+        curve = pc.percolationSweep(i, np.arange(0, 0.5, 0.05), samples, seeds[i-min])
+        print("Finished", i, "with rates", np.round(curve, 4))
+        f.write(str(i) + "\t" + "".join(str(round(rate, 4)) + "\t" for rate in curve) + "\n")
+    f.close()
+
+def adaptiveSolvability(dimm, p, tolerance=0.02, budget=1000, z=1.96, seed=None, batch=64, minRuns=10):
+    """
+    Estimates the solvability rate of (dimm, p) grids, sampling until the Wilson confidence interval on the rate
+    has a half-width of at most tolerance, or the budget runs out
+    Grids are drawn and solved a batch at a time, but the stopping rule is checked after every single sample, so the
+    sample count is the same as if they were drawn one by one
+    @params dimm: dimension of grid, p: probability measure of blocking elements, tolerance: target half-width,
+        budget: most samples to draw, z: normal quantile of the confidence level (1.96 for 95%), seed,
+        batch: grids drawn per wavefrontBFS call, minRuns: fewest samples to stop after
+    @return rate, (low, high) confidence interval, number of samples used
+    """
+    rng = np.random.default_rng(seed)
+    start = (0,0)
+    goal = (dimm-1,dimm-1)
+    outcomes = np.zeros(0, dtype=bool)
+    while len(outcomes) < budget:
+        solved, _ = wf.wavefrontBFS(gd.generateGrids(min(batch, budget - len(outcomes)), dimm, p, rng), start, goal)
+        first = len(outcomes)
+        outcomes = np.concatenate((outcomes, solved))
+        runs = np.arange(first + 1, len(outcomes) + 1)
+        _, halfWidth = wilsonInterval(np.cumsum(outcomes)[first:], runs, z)
+        done = np.flatnonzero((halfWidth <= tolerance) & (runs >= minRuns))
+        if (len(done) > 0):
+            outcomes = outcomes[:runs[done[0]]]
+            break
+    center, halfWidth = wilsonInterval(np.count_nonzero(outcomes), len(outcomes), z)
+    return np.count_nonzero(outcomes) / len(outcomes), (float(max(center - halfWidth, 0)), float(min(center + halfWidth, 1))), len(outcomes)
+
+def wilsonInterval(successes, runs, z):
+    """
+    Wilson score interval for a binomial rate, which stays sensible when the rate is close to 0 or 1
+    @return center, half-width
+    """
+    rate = successes / runs
+    scale = 1 + z * z / runs
+    center = (rate + z * z / (2 * runs)) / scale
+    halfWidth = z / scale * np.sqrt(rate * (1 - rate) / runs + z * z / (4 * runs * runs))
+    return center, halfWidth
+
+def graphDimVsSolvAdaptive(filename, upper=50, tolerance=0.02, budget=1000, seed=None):
+    """
+    The dim x p sweep of graphDimVsSolv, with every cell sampled adaptively by adaptiveSolvability
+    Each line of the output holds dim, p, rate, the confidence interval and the number of samples used
+    """
+    min = 2 #const
+    seeds = iter(np.random.SeedSequence(seed).spawn((upper - min + 1) * 10))
+    f = open(filename, "a+")
+    for i in range(min, upper + 1):
+        for p in np.arange(0, 0.5, 0.05):
+            rate, (low, high), runs = adaptiveSolvability(i, p, tolerance, budget, seed=next(seeds))
+            print("Finished", i, round(p, 2), "with a rate of", rate, "after", runs, "runs")
+            f.write(str(i) + "\t" + str(round(p, 2)) + "\t" + str(rate) + "\t" + str(round(low, 4)) + "\t" + str(round(high, 4)) + "\t" + str(runs) + "\n")
+    f.close()
+
+def compareSolvableGenerators(dimm, p, runs=1000, seed=None, maxDraws=100000):
+    """
+    Compares solvable grids from rejection sampling with grids from gd.generateSolvableGrid(carve=True)
+    Prints, for both, the blocked density and the mean shortest path length, and how much work each took
+    """
+    rejectRng, carveRng = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2)]
+    start = (0,0)
+    goal = (dimm-1,dimm-1)
+
+    rejected = []
+    draws = 0
+    while sum(len(g) for g in rejected) < runs and draws < maxDraws:
+        grids = gd.generateGrids(1000, dimm, p, rejectRng)
+        draws += len(grids)
+        rejected.append(grids[gd.isSolvable(grids, start, goal)])
+    rejected = np.concatenate(rejected)[:runs]
+
+    carved = gd.generateGrids(runs, dimm, p, carveRng)
+    repair = np.flatnonzero(~gd.isSolvable(carved, start, goal))
+    for i in repair:
+        gd.carveCorridor(carved[i], carveRng)
+
+    for name, grids, note in (("rejection", rejected, str(draws) + " draws"), ("carved", carved, str(len(repair)) + " repaired")):
+        if (len(grids) == 0):
+            print(name, ": no solvable grids after", note)
+            continue
+        _, lengths = wf.wavefrontBFS(grids, start, goal)
+        print(name, ": density", round(np.mean(grids == gd.BLOCKED), 4), "path length", round(lengths.mean(), 2),
+            "+/-", round(lengths.std(), 2), "over", len(grids), "grids,", note)
 
 if(__name__ == "__main__"): main()
\ No newline at end of file
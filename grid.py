@@ -1,37 +1,96 @@
 import numpy as np
 import random
+import json
 
 FIRE = 1
 BLOCKED = -1
 UNBLOCKED = 0
+CELL_TYPE = np.int8 #every cell is BLOCKED, UNBLOCKED or FIRE, so one byte a cell is enough (100 MB for a 10k x 10k grid)
+CORPUS_MAGIC = b"MAZECORP" #first bytes of a maze corpus file
+CORPUS_HEADER = 4096 #bytes reserved for a corpus file's header, the grids start right after it
+
+def newGrid(dimm):
+    """
+    return an empty (all UNBLOCKED) dimm x dimm grid
+    """
+    return np.zeros((dimm, dimm), dtype=CELL_TYPE)
 
 def generateGrid(dimm, p):
     """
     generate grid, where each element besides the first and last is randomly assigned either one or zero, depending on probability measure p
     IMPORTANT NOTE: grid will be accessed via (y,x), not (x,y), and the direction of y is reversed from a traditional plot
     @params dimm: dimension of grid, p: probability measure of blocking elements
-    @return grid
+    @return (dimm, dimm) grid of CELL_TYPE
     """
-    grid = np.zeros((dimm, dimm))
+    #same random.random() draws in the same row by row order as before, a row at a time so the draws never take
+    #more than one row of scratch memory
+    grid = newGrid(dimm)
     for row in grid:
-        for i, element in enumerate(row):
-            if (random.random() < p):
-                row[i] = BLOCKED
-            else:
-                row[i] = UNBLOCKED
+        row[np.fromiter((random.random() for _ in range(dimm)), dtype=np.float64, count=dimm) < p] = BLOCKED
     #make sure start and goal are free!
     grid[0][0] = UNBLOCKED
     grid[dimm-1][dimm-1] = UNBLOCKED
     return grid
 
-def generateSolvableGrid(dimm, p, algorithm):
-    grid = generateGrid(dimm, p)
-    solved, _, _ = algorithm(grid, (0, 0), (dimm-1, dimm-1))
-    while not solved:
-        grid = generateGrid(dimm, p)
-        solved, _, _ = algorithm(grid, (0, 0), (dimm-1, dimm-1))
+def generateGrids(count, dimm, p, seed=None, fire=False):
+    """
+    generate a batch of grids at once, using the same rules as generateGrid (and generateFireGrid if fire=True)
+    the grids are drawn from a numpy Generator, so a batch is reproducible from its seed
+    @params count: number of grids, dimm: dimension of each grid, p: probability measure of blocking elements,
+        seed: int, SeedSequence or Generator (None for fresh entropy), fire: put fire in the top right corner
+    @return (count, dimm, dimm) array of grids of CELL_TYPE
+    """
+    rng = np.random.default_rng(seed)
+    grids = (rng.random((count, dimm, dimm), dtype=np.float32) < p).view(CELL_TYPE)
+    np.negative(grids, out=grids) #True (1) becomes BLOCKED (-1), False stays UNBLOCKED (0)
+    #make sure start and goal are free!
+    grids[:, 0, 0] = UNBLOCKED
+    grids[:, dimm-1, dimm-1] = UNBLOCKED
+    if (fire):
+        grids[:, 0, dimm-1] = FIRE
+        grids[:, dimm-1, 0] = UNBLOCKED
+    return grids
 
-    return grid
+def generateSolvableGrid(dimm, p, algorithm=None, seed=None, batch=16, carve=False):
+    """
+    generate grids until one is solvable, drawing them in batches and checking the whole batch with isSolvable
+    with carve=True there are no retries: a single grid is drawn and, if it's unsolvable, repaired with carveCorridor,
+    so the cost is the same for every p (the output is biased towards shorter paths, see graphData.compareSolvableGenerators)
+    @params dimm: dimension of grid, p: probability measure of blocking elements,
+        algorithm: optional search to check solvability with instead of isSolvable (much slower, kept for comparison),
+        seed: int, SeedSequence or Generator, batch: number of grids drawn per attempt, carve: repair instead of retrying
+    @return grid
+    """
+    rng = np.random.default_rng(seed)
+    if (carve):
+        grid = generateGrids(1, dimm, p, rng)[0]
+        if (not isSolvable(grid)):
+            carveCorridor(grid, rng)
+        return grid
+    while True:
+        grids = generateGrids(batch, dimm, p, rng)
+        if (algorithm is None):
+            solvable = np.flatnonzero(isSolvable(grids))
+            first = solvable[0] if len(solvable) > 0 else None
+        else: #stops searching at the first solvable grid
+            first = next((i for i, grid in enumerate(grids) if algorithm(grid, (0, 0), (dimm-1, dimm-1))[0]), None)
+        if (first is not None):
+            return grids[first].copy()
+
+def carveCorridor(grid, seed=None):
+    """
+    unblock a random monotone staircase from the top left to the bottom right corner, which makes any grid solvable
+    the staircase is a random shuffle of dimm-1 down moves and dimm-1 right moves
+    @params grid: grid to carve in place, seed: int, SeedSequence or Generator
+    @return the carved cells as (ys, xs) arrays
+    """
+    rng = np.random.default_rng(seed)
+    dimm = len(grid)
+    down = rng.permutation(np.arange(2 * (dimm - 1)) < dimm - 1)
+    ys = np.concatenate(([0], np.cumsum(down)))
+    xs = np.concatenate(([0], np.cumsum(~down)))
+    grid[ys, xs] = UNBLOCKED
+    return ys, xs
 
 def generateFireGrid(dimm, p):
     """
@@ -46,13 +105,311 @@ def generateFireGrid(dimm, p):
 def grid_copy(grid):
     """
     retun a copy of a given grid
+    one bulk copy of the whole buffer, and the cell type is kept (int8 grids stay int8, probability grids stay float)
     """
-    dimm = len(grid)
-    newGrid = np.zeros((dimm, dimm))
-    for i in range(dimm):
-        for j in range(dimm):
-            newGrid[i][j] = grid[i][j]
-    return newGrid
+    return np.array(grid, copy=True)
+
+def packGrid(grid):
+    """
+    pack a grid's occupancy into a bitset, one bit per cell (set for open cells), 12.5 MB for a 10k x 10k grid
+    fire isn't kept, burning cells are open
+    @params grid: selected grid
+    @return (shape, bits): the grid's shape and a uint8 array of packed bits
+    """
+    grid = np.asarray(grid)
+    return grid.shape, np.packbits(grid != BLOCKED)
+
+def unpackGrid(packed):
+    """
+    turn the output of packGrid back into a grid of CELL_TYPE
+    """
+    shape, bits = packed
+    grid = np.unpackbits(bits, count=int(np.prod(shape))).reshape(shape).view(CELL_TYPE)
+    grid -= 1 #1 (open) becomes UNBLOCKED (0), 0 becomes BLOCKED (-1)
+    return grid
+
+def labelComponents(grids):
+    """
+    label the 4-connected open components of a grid, or of every grid in a (K, d, d) stack at once
+    @params grids: a single grid or a stack of grids
+    @return labels: same shape as grids, each open cell holds an id shared by its whole component
+        (ids are unique across the whole stack), blocked cells hold -1
+    """
+    runs, roots = runComponents(grids)
+    return np.where(runs >= 0, roots[np.maximum(runs, 0)], -1)
+
+def runComponents(grids):
+    """
+    find the 4-connected open components of a grid, or of every grid in a (K, d, d) stack at once
+    each horizontal run of open cells is one node to begin with, then a vectorized union-find joins runs that touch
+    vertically: every edge hooks the larger root onto the smaller one and pointer jumping flattens the trees,
+    until no edge joins two different roots
+    @params grids: a single grid or a stack of grids
+    @return runs: same shape as grids, the id of the horizontal run each open cell is in (-1 for blocked cells),
+        roots: array mapping each run id to an id shared by its whole component
+    """
+    grids = np.asarray(grids)
+    openCells = grids != BLOCKED
+    runStarts = openCells.copy()
+    runStarts[..., :, 1:] &= ~openCells[..., :, :-1] #an open cell starts a run unless its left neighbour is open
+    runs = np.cumsum(runStarts, dtype=np.int32 if grids.size < 2**31 else np.int64).reshape(grids.shape) - 1
+    runs[~openCells] = -1
+    down = openCells[..., :-1, :] & openCells[..., 1:, :] #open cells with an open lower neighbour
+    touching = down.copy()
+    touching[..., :, 1:] &= ~down[..., :, :-1] #two runs only need one edge, not one per column they share
+    first = runs[..., :-1, :][touching]
+    second = runs[..., 1:, :][touching]
+    parents = np.arange(max(int(runs.max(initial=-1)) + 1, 1), dtype=runs.dtype)
+    while True:
+        firstRoots = findRoots(parents, first)
+        secondRoots = findRoots(parents, second)
+        crossing = firstRoots != secondRoots
+        if (not crossing.any()): #every edge lies inside one component
+            break
+        #edges inside a component stay inside it, so only the crossing ones need to be looked at again
+        first = first[crossing]
+        second = second[crossing]
+        firstRoots = firstRoots[crossing]
+        secondRoots = secondRoots[crossing]
+        hooked = np.maximum(firstRoots, secondRoots)
+        np.minimum.at(parents, hooked, np.minimum(firstRoots, secondRoots))
+        while True: #roots hooked this round can form chains, so jump them straight to their new root
+            hookedParents = parents[hooked]
+            grandparents = parents[hookedParents]
+            if (np.array_equal(grandparents, hookedParents)):
+                break
+            parents[hooked] = grandparents
+    while True: #pointer jumping, until every run points straight at its root
+        grandparents = parents[parents]
+        if (np.array_equal(grandparents, parents)):
+            break
+        parents = grandparents
+    return runs, parents
+
+def findRoots(parents, nodes):
+    """
+    follow a parent array up from each of the given nodes until every one of them reaches a root
+    """
+    roots = parents[nodes]
+    while True:
+        grandparents = parents[roots]
+        if (np.array_equal(grandparents, roots)):
+            return roots
+        roots = grandparents
+
+def isSolvable(grids, start=(0, 0), goal=None):
+    """
+    solvability oracle: checks whether start and goal are in the same open component, without searching for a path
+    @params grids: a single grid or a (K, d, d) stack of grids, start: starting coordinates,
+        goal: goal coordinates (bottom right corner by default)
+    @return True/False for a single grid, or a boolean array with one entry per grid for a stack
+    """
+    runs, roots = runComponents(grids)
+    if (goal is None):
+        goal = (runs.shape[-2] - 1, runs.shape[-1] - 1)
+    startRuns = runs[..., start[0], start[1]]
+    goalRuns = runs[..., goal[0], goal[1]]
+    return (startRuns != -1) & (goalRuns != -1) & (roots[startRuns] == roots[goalRuns])
+
+def separatingCells(grid, start=(0, 0), goal=None):
+    """
+    find the open cells that would disconnect start from goal if they were blocked, so a mutation can be checked in O(1)
+    these are the articulation points on the start to goal path of a DFS tree: with one iterative Tarjan pass from start,
+    a cell v on that path separates them exactly when its child towards goal has no back edge above v (low >= disc[v])
+    opening a cell never breaks solvability and blocking any other cell can't either
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates (bottom right corner by default)
+    @return boolean array shaped like grid, True where blocking the cell makes goal unreachable from start
+        (all False if goal is already unreachable)
+    """
+    separating = np.zeros(np.shape(grid), dtype=bool)
+    if (goal is None):
+        goal = (separating.shape[0] - 1, separating.shape[1] - 1)
+    openCells, width, offsets = flattenGrid(grid)
+    source = flatIndex(start, width)
+    target = flatIndex(goal, width)
+    if (not openCells[source] or not openCells[target]):
+        return separating
+    discovered = [0] * len(openCells) #discovery time of each cell, 0 if not visited yet
+    low = [0] * len(openCells) #earliest discovery time reachable from the cell's subtree with one back edge
+    parents = [-1] * len(openCells)
+    discovered[source] = low[source] = 1
+    clock = 1
+    stack = [(source, iter(offsets))] #explicit DFS stack, each node with the neighbours it has left to try
+    while (stack):
+        node, neighbours = stack[-1]
+        for offset in neighbours:
+            neighbour = node + offset
+            if (not openCells[neighbour]):
+                continue
+            if (discovered[neighbour] == 0):
+                clock += 1
+                discovered[neighbour] = low[neighbour] = clock
+                parents[neighbour] = node
+                stack.append((neighbour, iter(offsets)))
+                break
+            if (discovered[neighbour] < low[node] and neighbour != parents[node]):
+                low[node] = discovered[neighbour]
+        else: #every neighbour tried, pass low up to the parent
+            stack.pop()
+            parent = parents[node]
+            if (parent != -1 and low[node] < low[parent]):
+                low[parent] = low[node]
+    if (discovered[target] == 0):
+        return separating
+    child = target
+    node = parents[target]
+    while (node != source and node != -1):
+        if (low[child] >= discovered[node]):
+            separating[gridCoords(node, width)] = True
+        child = node
+        node = parents[node]
+    return separating
+
+def flattenGrid(grid):
+    """
+    flatten a grid into a row-major bitmap of open cells, so searches can address a cell with a single integer
+    the grid is padded with a border of blocked cells, so neighbours never need a bounds check
+    @params grid: selected grid
+    @return openCells: bytearray (1 if open, 0 if blocked or padding), width: row width of the padded grid,
+        offsets: flat neighbour offsets ordered left, up, right, down
+    """
+    height, width = np.shape(grid)
+    padded = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = np.asarray(grid) != BLOCKED
+    width += 2
+    return bytearray(padded.tobytes()), width, (-1, -width, 1, width)
+
+def flatIndex(coords, width):
+    """
+    convert (y,x) coordinates into an index of a grid flattened by flattenGrid
+    """
+    y, x = coords
+    return (y + 1) * width + x + 1
+
+def gridCoords(index, width):
+    """
+    convert an index of a grid flattened by flattenGrid back into (y,x) coordinates
+    """
+    y, x = divmod(index, width)
+    return (y - 1, x - 1)
+
+def gridCoordsList(indices, width):
+    """
+    convert many flat indices back into a list of (y,x) coordinates in one vectorized pass
+    """
+    y, x = np.divmod(np.asarray(indices, dtype=np.int64) - width - 1, width)
+    return list(zip(y.tolist(), x.tolist()))
+
+def writeCorpus(path, grids, p=None, seed=None, metadata=None):
+    """
+    write a stack of grids to a maze corpus file, replacing the file if it exists
+    a corpus is a fixed size header (magic bytes, then JSON with count, dimm, p, seed and metadata, padded with spaces to
+    CORPUS_HEADER bytes) followed by the grids as one raw (count, dimm, dimm) block of CELL_TYPE, so it can be memory
+    mapped straight off the disk by openCorpus
+    @params path: file to write, grids: a single grid or a (K, d, d) stack of grids, p: blocking probability the grids
+        were drawn with (None if they weren't, like hardest mazes), seed: int seed they were drawn from (or None),
+        metadata: any other JSON serializable dict to keep with them
+    @return header of the new corpus
+    """
+    grids = corpusGrids(grids)
+    header = {"count": 0, "dimm": grids.shape[1], "p": None if p is None else float(p),
+        "seed": None if seed is None else int(seed), "metadata": metadata or {}}
+    with open(path, "wb") as f:
+        f.write(corpusHeader(header))
+    return appendCorpus(path, grids)
+
+def generateCorpus(path, count, dimm, p, seed=None, batch=64, fire=False, metadata=None):
+    """
+    write count grids from generateGrids to a corpus file, a batch at a time so the whole corpus is never in memory
+    the same seed and batch give the same corpus
+    @params path: file to write, count: number of grids, dimm: dimension of each grid, p: probability measure of
+        blocking elements, seed: int seed (None for fresh entropy, which is then recorded in the header), batch: grids
+        generated per write, fire: put fire in the top right corner, metadata: extra JSON serializable dict for the header
+    @return header of the new corpus
+    """
+    if (seed is None):
+        seed = int(np.random.SeedSequence().entropy)
+    rng = np.random.default_rng(seed)
+    header = writeCorpus(path, np.empty((0, dimm, dimm), dtype=CELL_TYPE), p, seed, dict(metadata or {}, fire=fire))
+    for done in range(0, count, batch):
+        header = appendCorpus(path, generateGrids(min(batch, count - done), dimm, p, rng, fire))
+    return header
+
+def appendCorpus(path, grids, metadata=None):
+    """
+    add grids to the end of an existing corpus file, and bump the count in its header
+    @params path: corpus file, grids: a single grid or a (K, d, d) stack with the corpus' dimension,
+        metadata: optional dict of entries to update in the header's metadata
+    @return updated header
+    """
+    grids = corpusGrids(grids)
+    header = readCorpusHeader(path)
+    if (grids.shape[1:] != (header["dimm"], header["dimm"])):
+        raise ValueError("grids are " + str(grids.shape[1:]) + ", the corpus holds " + str(header["dimm"]) + " x " + str(header["dimm"]))
+    header["count"] += len(grids)
+    header["metadata"].update(metadata or {})
+    block = corpusHeader(header) #encoded before anything is written, so a header that's too big leaves the file as it was
+    with open(path, "r+b") as f:
+        f.seek(CORPUS_HEADER + (header["count"] - len(grids)) * header["dimm"] ** 2)
+        grids.tofile(f)
+        f.truncate() #drop anything left over past the last grid
+        f.seek(0)
+        f.write(block)
+    return header
+
+def readCorpusHeader(path):
+    """
+    @return the header of a corpus file as a dict with count, dimm, p, seed and metadata
+    """
+    with open(path, "rb") as f:
+        block = f.read(CORPUS_HEADER)
+    if (not block.startswith(CORPUS_MAGIC)):
+        raise ValueError(str(path) + " is not a maze corpus")
+    return json.loads(block[len(CORPUS_MAGIC):].decode("utf-8"))
+
+def openCorpus(path, writable=False):
+    """
+    memory map a corpus file, nothing is read until a grid is used and slicing never copies
+    worker processes should be sent the path and open the corpus themselves, rather than be sent the array
+    @params path: corpus file, writable: map it read/write (changes go straight to the file) instead of read only
+    @return header, (count, dimm, dimm) memory mapped array of grids
+    """
+    header = readCorpusHeader(path)
+    shape = (header["count"], header["dimm"], header["dimm"])
+    if (header["count"] == 0): #an empty file region can't be mapped
+        return header, np.empty(shape, dtype=CELL_TYPE)
+    return header, np.memmap(path, dtype=CELL_TYPE, mode="r+" if writable else "r", offset=CORPUS_HEADER, shape=shape)
+
+def streamCorpus(path, batch=None, start=0, stop=None):
+    """
+    lazily yield the grids of a corpus file in order, each one a view into the memory map
+    @params path: corpus file, batch: None yields single grids, otherwise (batch, d, d) stacks (the last one may be
+        smaller), start, stop: range of grid indices to go over
+    """
+    _, grids = openCorpus(path)
+    stop = len(grids) if stop is None else min(stop, len(grids))
+    if (batch is None):
+        for i in range(start, stop):
+            yield grids[i]
+    else:
+        for i in range(start, stop, batch):
+            yield grids[i:min(i + batch, stop)]
+
+def corpusGrids(grids):
+    """
+    a single grid or a stack of grids as a C ordered (K, d, d) stack of CELL_TYPE, ready to be written to a corpus
+    """
+    grids = np.ascontiguousarray(grids, dtype=CELL_TYPE)
+    return grids[np.newaxis] if grids.ndim == 2 else grids
+
+def corpusHeader(header):
+    """
+    encode a corpus header into its fixed size block
+    """
+    block = CORPUS_MAGIC + json.dumps(header).encode("utf-8")
+    if (len(block) >= CORPUS_HEADER):
+        raise ValueError("corpus header is over " + str(CORPUS_HEADER) + " bytes, the metadata is too big")
+    return block + b" " * (CORPUS_HEADER - len(block) - 1) + b"\n"
 
 def main():
     """Testing method"""
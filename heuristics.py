@@ -1,4 +1,11 @@
 import math
+import numpy as np
+from array import array
+from collections import OrderedDict
+import wavefront as wf
+
+flatFields = OrderedDict() #cache of padded, flattened heuristic fields, keyed on the heuristic, grid shape and goal
+flatFieldBytes = 64 * 2**20 #most bytes of fields kept in the cache, least recently used ones are dropped first
 
 def returnZero(start, end):
     """
@@ -20,4 +27,124 @@ def Manhattan(start, end):
     """
     y1, x1 = start
     y2, x2 = end
-    return abs(y1 - y2) + abs(x1 - x2)
\ No newline at end of file
+    return abs(y1 - y2) + abs(x1 - x2)
+
+def returnZeroField(shape, goal):
+    """
+    returnZero for every cell of a grid at once
+    """
+    return np.zeros(shape)
+
+def EucField(shape, goal):
+    """
+    Euc from every cell of a grid to goal at once
+    """
+    ys, xs = np.indices(shape)
+    return np.hypot(ys - goal[0], xs - goal[1])
+
+def ManhattanField(shape, goal):
+    """
+    Manhattan from every cell of a grid to goal at once
+    """
+    ys, xs = np.indices(shape)
+    return (np.abs(ys - goal[0]) + np.abs(xs - goal[1])).astype(float)
+
+#vectorized forms: heuristic.field(shape, goal) gives the heuristic from every cell to goal as a (d, d) array
+returnZero.field = returnZeroField
+Euc.field = EucField
+Manhattan.field = ManhattanField
+
+def DistanceField(grid, goal):
+    """
+    h(x) = exact distance to goal, read from the cached wf.distanceField of the grid
+    it never overestimates, even when fire rules forbid some moves, since those only make real paths longer
+    cells that can't reach the goal get infinity
+    @return heuristic function for this grid and goal
+    """
+    field = wf.distanceField(grid, goal)
+    def DistanceField(start, end):
+        distance = field[start]
+        return distance if distance >= 0 else math.inf
+    #like the function, the field is always towards the goal it was built for
+    DistanceField.field = lambda shape, end: np.where(field >= 0, field, math.inf)
+    DistanceField.ownField = True #made for one grid, so flatField keeps its flat field on it instead of in flatFields
+    return DistanceField
+
+def ALT(grid, landmarks=8, start=(0, 0)):
+    """
+    h(x) = max over landmarks L of |d(L, goal) - d(L, x)|, a lower bound on d(x, goal) by the triangle inequality
+    landmarks are picked by farthest-point selection inside the start's component: the first is the cell farthest
+    from start, and each next one is the cell farthest from every landmark picked so far
+    their distance tables are wf.distanceField arrays, so building ALT for a grid that's been seen before is cheap
+    @params grid: selected grid, landmarks: number of landmarks, start: cell whose component the landmarks are picked in
+    @return heuristic function for this grid, works for any goal
+    """
+    tables = []
+    nearest = wf.distanceField(grid, start).astype(float)
+    nearest[nearest < 0] = -math.inf #cells outside the start's component are never picked
+    for _ in range(landmarks):
+        landmark = divmod(int(nearest.argmax()), nearest.shape[1])
+        if (nearest[landmark] <= 0): #every reachable cell is already a landmark
+            break
+        table = wf.distanceField(grid, landmark)
+        tables.append(table)
+        nearest = np.minimum(nearest, table)
+    tables = np.array(tables) if tables else np.zeros((0,) + np.shape(grid), dtype=np.int32)
+    fields = dict() #bound for every cell, built the first time each goal is asked for
+
+    def ALT(start, end):
+        if (end not in fields):
+            fields[end] = ALTField(tables, end)
+        return fields[end][start]
+    ALT.field = lambda shape, end: ALTField(tables, end)
+    ALT.ownField = True
+    return ALT
+
+def ALTField(tables, goal):
+    """
+    ALT bound from every cell to the goal at once, given the landmark distance tables
+    cells a landmark reaches but the goal doesn't (or the other way around) are in another component, so they get infinity
+    """
+    goalDistances = tables[:, goal[0], goal[1], np.newaxis, np.newaxis]
+    known = (tables >= 0) & (goalDistances >= 0)
+    bound = np.where(known, np.abs(goalDistances - tables), 0).max(axis=0, initial=0).astype(float)
+    bound[((tables >= 0) != (goalDistances >= 0)).any(axis=0)] = math.inf
+    return bound
+
+def flatField(heuristic, shape, goal):
+    """
+    The heuristic from every cell to goal, laid out like gd.flattenGrid (padding included) so a search can read it
+    with a flat index instead of calling the heuristic
+    Fields of the module level heuristics are cached on the heuristic, grid shape and goal, up to flatFieldBytes in
+    total (a field bigger than that isn't cached). Heuristics made for one grid (DistanceField, ALT) only keep their
+    latest field on themselves, so it goes away with them
+    @params heuristic: any heuristic, shape: shape of the grid, goal: goal coordinates
+    @return array('d') of heuristic values by flat index (8 bytes a cell), or None if the heuristic has no vectorized form
+    """
+    if (not hasattr(heuristic, "field")):
+        return None
+    key = (tuple(shape), tuple(goal))
+    if (getattr(heuristic, "ownField", False)):
+        if (getattr(heuristic, "flatField", (None,))[0] != key):
+            heuristic.flatField = (key, buildFlatField(heuristic, shape, goal))
+        return heuristic.flatField[1]
+    key = (heuristic,) + key
+    if (key in flatFields):
+        flatFields.move_to_end(key)
+        return flatFields[key]
+    values = buildFlatField(heuristic, shape, goal)
+    if (values.itemsize * len(values) <= flatFieldBytes):
+        flatFields[key] = values
+        while (sum(field.itemsize * len(field) for field in flatFields.values()) > flatFieldBytes):
+            flatFields.popitem(last=False)
+    return values
+
+def buildFlatField(heuristic, shape, goal):
+    """
+    Pads and flattens heuristic.field into an array('d'), which indexes about as fast as a list at a quarter of the size
+    """
+    padded = np.full((shape[0] + 2, shape[1] + 2), math.inf)
+    padded[1:-1, 1:-1] = heuristic.field(shape, goal)
+    values = array("d")
+    values.frombytes(padded.tobytes())
+    return values
@@ -0,0 +1,272 @@
+import numpy as np
+import heapq as heap
+import math
+from collections import deque
+import grid as gd
+import algorithms as algo
+import stats as st
+import transposition as tp
+
+abstractGraphs = tp.newCache(8) #cache of abstract graphs, keyed on the open cells of the grid and the cluster size
+clusterTypes = {8: "<u1", 16: "<u2", 32: "<u4", 64: "<u8"} #one cluster row fits in one word of these
+
+def HPAStar(grid, start, goal, clusterSize=16, stats=None):
+    """
+    Runs a hierarchical (HPA*) search from start to goal on the given grid
+    The grid is split into clusterSize x clusterSize clusters, with abstract nodes on the open cells along cluster
+    borders and precomputed distances between the nodes of each cluster (see abstractGraph, which is cached per grid).
+    A query connects start and goal to the nodes of their clusters, searches the abstract graph, then refines each
+    abstract edge into cells. Paths are near-optimal, not always shortest
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates, clusterSize: 8, 16, 32 or 64,
+        stats: optional collector from st.newStats, counts are for the abstract search (refining the path isn't counted,
+        only timed)
+    @return True/False if a path exists or not, order of nodes used to traverse path if one exists,
+    tuple containing output debug data (number of abstract nodes expanded, abstract nodes in the order they were expanded)
+    """
+    since = st.clock(stats)
+    graph = abstractGraph(grid, clusterSize)
+    nodes = len(graph["partners"])
+    #start and goal are added to the abstract graph just for this query
+    query = {"source": nodes, "target": nodes + 1, "start": start, "goal": goal}
+    query["startCluster"], query["startDistances"] = entranceDistances(graph, start)
+    query["goalCluster"], query["goalDistances"] = entranceDistances(graph, goal)
+    query["direct"] = -1
+    if (query["startCluster"] == query["goalCluster"]):
+        query["direct"] = clusterDistances(graph, query["startCluster"], clusterCell(graph, start))[clusterCell(graph, goal)]
+    source, target = query["source"], query["target"]
+    coords = lambda node: start if node == source else goal if node == target else graph["coords"][node]
+    heuristic = lambda node: abs(coords(node)[0] - goal[0]) + abs(coords(node)[1] - goal[1])
+
+    gVals = {source: 0}
+    parents = {source: None}
+    closed = set()
+    exploredNodes = []
+    frontier = [(heuristic(source), 0, source)]
+    pushes = 1
+    tracking = stats is not None
+    largestFringe = 0
+    since = st.phase(stats, "setup", since)
+    while (len(frontier) > 0):
+        if (tracking and len(frontier) > largestFringe):
+            largestFringe = len(frontier)
+        _, g, current = heap.heappop(frontier)
+        if (current in closed or g != gVals[current]):
+            continue
+        closed.add(current)
+        exploredNodes.append(coords(current))
+        if (current == target):
+            since = st.record(stats, since, len(exploredNodes), pushes, largestFringe, 0, pushes)
+            path = refinePath(graph, abstractPath(parents, target), coords)
+            st.phase(stats, "path", since)
+            return (True, path, (len(closed), exploredNodes))
+        for neighbour, cost in abstractNeighbours(graph, current, query):
+            newG = g + cost
+            if (newG < gVals.get(neighbour, math.inf)):
+                gVals[neighbour] = newG
+                parents[neighbour] = current
+                heap.heappush(frontier, (newG + heuristic(neighbour), newG, neighbour))
+                pushes += 1
+    st.record(stats, since, len(exploredNodes), pushes, largestFringe, 0, pushes)
+    return False, None, (len(closed), exploredNodes)
+
+def abstractNeighbours(graph, node, query):
+    """
+    Lists the abstract edges out of a node as (neighbour, cost) pairs, including the query's temporary start and goal nodes
+    """
+    first = graph["clusterFirst"]
+    if (node == query["source"]):
+        base = first[query["startCluster"]]
+        edges = [(base + slot, int(d)) for slot, d in enumerate(query["startDistances"]) if d >= 0]
+        if (query["direct"] >= 0): #start and goal share a cluster
+            edges.append((query["target"], int(query["direct"])))
+        return edges
+    edges = graph["edges"][node]
+    cluster = graph["clusters"][node]
+    if (cluster == query["goalCluster"]):
+        slot = node - first[cluster]
+        if (query["goalDistances"][slot] >= 0):
+            edges = edges + [(query["target"], int(query["goalDistances"][slot]))]
+    return edges
+
+def abstractPath(parents, target):
+    """
+    Walks the abstract search's parents back from the goal
+    @return list of abstract nodes from start to goal
+    """
+    path = [target]
+    while (parents[path[-1]] is not None):
+        path.append(parents[path[-1]])
+    path.reverse()
+    return path
+
+def refinePath(graph, nodes, coords):
+    """
+    Turns a path of abstract nodes into a path of cells: border crossings are single steps, and moves inside a
+    cluster are filled in with a BFS restricted to that cluster
+    @return path: array of coords from start to goal
+    """
+    size = graph["clusterSize"]
+    path = [coords(nodes[0])]
+    for previous, current in zip(nodes, nodes[1:]):
+        (y1, x1), (y2, x2) = coords(previous), coords(current)
+        if ((y1 // size, x1 // size) != (y2 // size, x2 // size)): #border crossing
+            path.append((y2, x2))
+            continue
+        top, left = y1 // size * size, x1 // size * size
+        cluster = np.where(graph["openCells"][top:top + size, left:left + size], gd.UNBLOCKED, gd.BLOCKED)
+        _, local, _ = algo.BFS(cluster, (y1 - top, x1 - left), (y2 - top, x2 - left), None, False)
+        path.extend((y + top, x + left) for y, x in local[1:])
+    return path
+
+def entranceDistances(graph, coords):
+    """
+    Distances from a cell to every abstract node of its cluster, found with a BFS restricted to that cluster
+    @return cluster id, array of distances indexed by slot (-1 if the node can't be reached)
+    """
+    size = graph["clusterSize"]
+    cluster = (coords[0] // size) * graph["clusterColumns"] + coords[1] // size
+    distances = clusterDistances(graph, cluster, clusterCell(graph, coords))
+    first, last = graph["clusterFirst"][cluster], graph["clusterFirst"][cluster + 1]
+    return cluster, distances[graph["ys"][first:last] % size * size + graph["xs"][first:last] % size]
+
+def clusterCell(graph, coords):
+    """
+    Index of a cell inside its cluster, row-major
+    """
+    size = graph["clusterSize"]
+    return coords[0] % size * size + coords[1] % size
+
+def clusterDistances(graph, cluster, cell):
+    """
+    BFS distances from one cell of a cluster to every other cell of that cluster
+    @return array of distances indexed by clusterCell (-1 if unreachable)
+    """
+    size = graph["clusterSize"]
+    top, left = cluster // graph["clusterColumns"] * size, cluster % graph["clusterColumns"] * size
+    openCells = graph["openCells"][top:top + size, left:left + size].ravel()
+    distances = np.full(size * size, -1)
+    if (not openCells[cell]):
+        return distances
+    distances[cell] = 0
+    frontier = deque([cell])
+    while (len(frontier) > 0):
+        current = frontier.popleft()
+        y, x = divmod(current, size)
+        for neighbour, inside in ((current - 1, x > 0), (current - size, y > 0), (current + 1, x < size - 1), (current + size, y < size - 1)):
+            if (inside and openCells[neighbour] and distances[neighbour] < 0):
+                distances[neighbour] = distances[current] + 1
+                frontier.append(neighbour)
+    return distances
+
+def abstractGraph(grid, clusterSize=16):
+    """
+    Builds (or fetches from the cache) the abstract graph HPAStar searches on
+    Every maximal run of open cell pairs across a cluster border is an entrance, with an abstract node on each side
+    (in the middle of the run, or at both ends of runs of 6 or more). Distances between the nodes of a cluster are
+    found for all clusters at once: each cluster row is one machine word, so a BFS step is a few shifts and masks
+    over a (clusters, clusterSize) array, and there is one such BFS per node slot
+    @params grid: selected grid, clusterSize: 8, 16, 32 or 64
+    @return dict with the padded open cells, node coordinates, clusters, partners across borders and intra-cluster distances
+    """
+    openCells = np.asarray(grid) != gd.BLOCKED
+    key = (openCells.shape, clusterSize, np.packbits(openCells).tobytes())
+    cached = tp.cacheLookup(abstractGraphs, key)
+    if (cached is not None):
+        return cached
+
+    size = clusterSize
+    rows, columns = -(-openCells.shape[0] // size), -(-openCells.shape[1] // size)
+    padded = np.zeros((rows * size, columns * size), dtype=bool)
+    padded[:openCells.shape[0], :openCells.shape[1]] = openCells
+
+    #entrances across vertical borders, then across horizontal ones (by looking at the transposed grid)
+    ys, xs, partners = [], [], []
+    count = 0
+    for transposed in (False, True):
+        cells = padded.T if transposed else padded
+        borders = np.arange(1, (rows if transposed else columns)) * size
+        pairs = cells[:, borders - 1] & cells[:, borders] #open on both sides of each border, shape (cells, borders)
+        segments = pairs.T.reshape(len(borders), len(cells) // size, size) #split each border into one segment per cluster
+        starts = segments.copy()
+        starts[:, :, 1:] &= ~segments[:, :, :-1]
+        ends = segments.copy()
+        ends[:, :, :-1] &= ~segments[:, :, 1:]
+        border, segment, first = np.nonzero(starts)
+        last = np.nonzero(ends)[2]
+        short = last - first + 1 < 6
+        offsets = np.concatenate(((first + last)[short] // 2, first[~short], last[~short]))
+        border = np.concatenate((border[short], border[~short], border[~short]))
+        along = np.concatenate((segment[short], segment[~short], segment[~short])) * size + offsets
+        across = borders[border]
+        for side in (-1, 0): #the node before the border, then the one after it
+            ys.append(across + side if transposed else along)
+            xs.append(along if transposed else across + side)
+        partners.append(count + len(along) + np.arange(len(along)))
+        partners.append(count + np.arange(len(along)))
+        count += 2 * len(along)
+    ys, xs, partners = np.concatenate(ys), np.concatenate(xs), np.concatenate(partners)
+
+    #sort nodes by cluster, so the nodes of a cluster are one contiguous range of slots
+    clusters = ys // size * columns + xs // size
+    order = np.argsort(clusters, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    ys, xs, clusters, partners = ys[order], xs[order], clusters[order], rank[partners[order]]
+    clusterFirst = np.searchsorted(clusters, np.arange(rows * columns + 1))
+    slots = np.arange(len(clusters)) - clusterFirst[clusters]
+    counts = np.diff(clusterFirst)
+
+    #one row of bits per cluster row: bit x of word [cluster, y] is cell (y, x) of that cluster
+    words = np.packbits(padded.reshape(rows, size, columns, size).transpose(0, 2, 1, 3), axis=-1, bitorder="little")
+    words = words.view(clusterTypes[size]).reshape(rows * columns, size).astype(clusterTypes[size][1:])
+    intra = np.full((len(clusters), max(counts.max(initial=0), 1)), -1, dtype=np.int32)
+    for slot in range(counts.max(initial=0)):
+        sources = np.flatnonzero(slots == slot) #the node in this slot of every cluster that has one
+        batch = clusters[sources]
+        index = np.full(rows * columns, -1)
+        index[batch] = np.arange(len(batch))
+        targets = np.flatnonzero(counts[clusters] > slot) #every node of those clusters
+        distances = intraDistances(words[batch], (ys[sources] % size, xs[sources] % size),
+            (index[clusters[targets]], ys[targets] % size, xs[targets] % size), size)
+        intra[targets, slot] = distances
+
+    #abstract edges of every node as plain lists, since the search looks them up once per expansion
+    edges = []
+    for node, (row, cluster, partner) in enumerate(zip(intra.tolist(), clusters.tolist(), partners.tolist())):
+        base = int(clusterFirst[cluster])
+        edges.append([(base + slot, d) for slot, d in enumerate(row) if d >= 0 and base + slot != node] + [(partner, 1)])
+
+    graph = {"clusterSize": size, "clusterColumns": columns, "openCells": padded, "ys": ys, "xs": xs,
+        "coords": list(zip(ys.tolist(), xs.tolist())), "clusters": clusters.tolist(), "partners": partners,
+        "clusterFirst": clusterFirst.tolist(), "intra": intra, "edges": edges}
+    tp.cacheStore(abstractGraphs, key, graph)
+    return graph
+
+def intraDistances(words, sources, targets, size):
+    """
+    BFS inside many clusters at once, one source per cluster
+    @params words: (clusters, size) bit rows of open cells, sources: (rows, columns) of each cluster's source,
+        targets: (cluster, row, column) of the cells to report distances for, size: cluster size
+    @return distance to each target, -1 if its source can't reach it
+    """
+    one = words.dtype.type(1)
+    free = words.copy()
+    frontier = np.zeros_like(words)
+    rows = np.arange(len(words))
+    frontier[rows, sources[0]] = one << sources[1].astype(words.dtype)
+    free &= ~frontier
+    cluster, row, column = targets
+    column = column.astype(words.dtype)
+    distances = np.where((frontier[cluster, row] >> column) & one, 0, -1)
+    step = 0
+    while (frontier.any()):
+        step += 1
+        grow = (frontier << one) | (frontier >> one)
+        grow[:, 1:] |= frontier[:, :-1]
+        grow[:, :-1] |= frontier[:, 1:]
+        grow &= free
+        free ^= grow
+        frontier = grow
+        reached = ((frontier[cluster, row] >> column) & one).astype(bool)
+        distances[reached] = step
+    return distances
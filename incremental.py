@@ -0,0 +1,150 @@
+import numpy as np
+import heapq as heap
+import math
+import grid as gd
+import stats as st
+
+def newPlanner(grid, start, goal):
+    """
+    Sets up a D* Lite planner from start to goal on the given grid
+    D* Lite searches backwards from the goal, so g values are distances to the goal and stay valid when the start
+    moves. When cells catch fire only the cells next to them are put back on the open list, and the next replan
+    repairs the g values that actually changed instead of searching the whole grid again
+    Cells on fire can't be entered (they can still be left, the runner may be standing on one)
+    @params grid: selected grid, start: starting coordinates, goal: goal coordinates
+    @return planner state, passed to burnCells and replan
+    """
+    openCells, width, offsets = gd.flattenGrid(grid)
+    fire = np.zeros((len(grid) + 2, width), dtype=bool)
+    fire[1:-1, 1:-1] = np.asarray(grid) == gd.FIRE
+    enterable = bytearray(openCells)
+    for cell in np.flatnonzero(fire).tolist():
+        enterable[cell] = 0
+    target = gd.flatIndex(goal, width)
+    planner = {"openCells": openCells, "enterable": enterable, "width": width, "offsets": offsets, "goal": target,
+        "start": gd.flatIndex(start, width), "km": 0, "g": [math.inf] * len(openCells), "rhs": [math.inf] * len(openCells),
+        "keys": [None] * len(openCells), "frontier": [], "burning": [], "expansions": 0, "pushes": 1, "largestFringe": 1}
+    planner["rhs"][target] = 0
+    planner["keys"][target] = (distance(planner, target), 0)
+    planner["frontier"].append((planner["keys"][target], target))
+    return planner
+
+def burnCells(planner, cells):
+    """
+    Marks cells as on fire. Nothing is searched yet, the affected cells are repaired on the next replan
+    @params planner: output of newPlanner, cells: iterable of (y, x) coordinates that just caught fire
+    """
+    width = planner["width"]
+    for y, x in cells:
+        cell = (y + 1) * width + x + 1
+        if (planner["enterable"][cell]):
+            planner["enterable"][cell] = 0
+            planner["burning"].append(cell)
+
+def replan(planner, start, stats=None):
+    """
+    Finds the shortest path from start to the goal that doesn't enter a cell on fire, reusing the previous search
+    @params planner: output of newPlanner, start: the runner's current coordinates,
+        stats: optional collector from st.newStats, gets the work done by this replan only
+    @return True/False if a path exists or not, order of nodes used to traverse path if one exists
+    """
+    since = st.clock(stats)
+    expansions, pushes = planner["expansions"], planner["pushes"]
+    width = planner["width"]
+    start = gd.flatIndex(start, width)
+    if (start != planner["start"]):
+        #keys already on the open list were computed from the old start, km keeps them comparable to new ones
+        planner["km"] += distance(planner, planner["start"], start)
+        planner["start"] = start
+    for cell in planner["burning"]: #entering these got more expensive, so their neighbours' rhs may have changed
+        for offset in planner["offsets"]:
+            if (planner["openCells"][cell + offset]):
+                updateVertex(planner, cell + offset)
+    planner["burning"] = []
+    computeShortestPath(planner)
+    #the planner's heap keeps growing between replans, so its peak is reported as it is, not per replan
+    since = st.record(stats, since, planner["expansions"] - expansions, planner["pushes"] - pushes, planner["largestFringe"])
+
+    g, enterable = planner["g"], planner["enterable"]
+    if (g[start] == math.inf):
+        return False, None
+    path = [start]
+    while (path[-1] != planner["goal"]): #walk downhill on g
+        current = path[-1]
+        path.append(min((current + offset for offset in planner["offsets"] if enterable[current + offset]), key=g.__getitem__))
+    path = gd.gridCoordsList(path, width)
+    st.phase(stats, "path", since)
+    return True, path
+
+def distance(planner, cell, other=None):
+    """
+    Manhattan distance between two flat cells, the start by default
+    """
+    if (other is None):
+        other = planner["start"]
+    y1, x1 = divmod(cell, planner["width"])
+    y2, x2 = divmod(other, planner["width"])
+    return abs(y1 - y2) + abs(x1 - x2)
+
+def calculateKey(planner, cell):
+    """
+    Priority of a cell on the open list: (min(g, rhs) + h + km, min(g, rhs))
+    """
+    best = min(planner["g"][cell], planner["rhs"][cell])
+    return (best + distance(planner, cell) + planner["km"], best)
+
+def updateVertex(planner, cell):
+    """
+    Recomputes a cell's rhs from its neighbours, and puts it on the open list if it's now inconsistent
+    """
+    g, rhs, enterable = planner["g"], planner["rhs"], planner["enterable"]
+    if (cell != planner["goal"]):
+        best = math.inf
+        for offset in planner["offsets"]:
+            neighbour = cell + offset
+            if (enterable[neighbour] and g[neighbour] < best):
+                best = g[neighbour]
+        rhs[cell] = best + 1
+    if (g[cell] != rhs[cell]):
+        key = calculateKey(planner, cell)
+        planner["keys"][cell] = key
+        heap.heappush(planner["frontier"], (key, cell))
+        planner["pushes"] += 1
+    else:
+        planner["keys"][cell] = None
+
+def computeShortestPath(planner):
+    """
+    Expands inconsistent cells until the start is consistent and nothing on the open list can change its g
+    The open list is a lazy-deletion heap: keys holds each cell's live key, anything else is a stale entry
+    """
+    g, rhs, keys, frontier = planner["g"], planner["rhs"], planner["keys"], planner["frontier"]
+    openCells, offsets, start = planner["openCells"], planner["offsets"], planner["start"]
+    largestFringe = planner["largestFringe"]
+    while (len(frontier) > 0):
+        if (len(frontier) > largestFringe):
+            largestFringe = len(frontier)
+        key, cell = frontier[0]
+        if (keys[cell] != key): #stale entry
+            heap.heappop(frontier)
+            continue
+        if (key >= calculateKey(planner, start) and rhs[start] == g[start]):
+            break
+        heap.heappop(frontier)
+        newKey = calculateKey(planner, cell)
+        if (key < newKey): #the start has moved since this was pushed, try again with the right key
+            keys[cell] = newKey
+            heap.heappush(frontier, (newKey, cell))
+            planner["pushes"] += 1
+            continue
+        planner["expansions"] += 1
+        keys[cell] = None
+        if (g[cell] > rhs[cell]): #got cheaper
+            g[cell] = rhs[cell]
+        else: #got more expensive, so it has to be worked out again along with everything that relied on it
+            g[cell] = math.inf
+            updateVertex(planner, cell)
+        for offset in offsets:
+            if (openCells[cell + offset]):
+                updateVertex(planner, cell + offset)
+    planner["largestFringe"] = largestFringe
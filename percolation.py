@@ -0,0 +1,98 @@
+import numpy as np
+import math
+import grid as gd
+
+def connectionThresholds(dimm, samples, seed=None, start=(0, 0), goal=None):
+    """
+    Newman-Ziff percolation: for each sample, opens the cells of an empty grid one at a time in random order, joining
+    each new cell to its open neighbours with a union-find, and records how many cells had been opened when start and
+    goal first became connected
+    Start and goal are always open, just like in gd.generateGrid, so they aren't part of the random order
+    @params dimm: dimension of grid, samples: number of random orders, seed: int, SeedSequence or Generator,
+        start: starting coordinates, goal: goal coordinates (bottom right corner by default)
+    @return thresholds: number of opened cells at the moment of connection, one per sample
+    """
+    if (goal is None):
+        goal = (dimm - 1, dimm - 1)
+    rng = np.random.default_rng(seed)
+    width = dimm + 2 #same padded layout as gd.flattenGrid, so the border is never open and needs no bounds checks
+    source = gd.flatIndex(start, width)
+    target = gd.flatIndex(goal, width)
+    cells = np.arange(width * width).reshape(width, width)[1:-1, 1:-1].ravel()
+    cells = cells[(cells != source) & (cells != target)]
+    thresholds = np.empty(samples, dtype=np.int64)
+    for k in range(samples):
+        thresholds[k] = firstConnection(rng.permutation(cells).tolist(), width, source, target)
+    return thresholds
+
+def firstConnection(order, width, source, target):
+    """
+    Opens cells in the given order until source and target are connected
+    @params order: flat indices of the cells to open, width: row width of the padded grid, source, target: flat indices
+    @return number of cells opened at the moment of connection, or len(order) + 1 if they never connect
+    """
+    offsets = (-1, -width, 1, width)
+    parents = list(range(width * width))
+    sizes = [1] * (width * width)
+    opened = bytearray(width * width)
+    opened[source] = opened[target] = 1
+    if (source == target or target - source in offsets): #already connected before anything is opened
+        return 0
+    sourceRoot = source
+    targetRoot = target
+    for count, cell in enumerate(order, 1):
+        opened[cell] = 1
+        root = cell
+        for offset in offsets:
+            neighbour = cell + offset
+            if (not opened[neighbour]):
+                continue
+            while (parents[neighbour] != neighbour): #find, with path halving
+                parents[neighbour] = parents[parents[neighbour]]
+                neighbour = parents[neighbour]
+            if (neighbour == root):
+                continue
+            if (sizes[neighbour] > sizes[root]): #union by size
+                root, neighbour = neighbour, root
+            parents[neighbour] = root
+            sizes[root] += sizes[neighbour]
+            #keep track of the roots of source and target as their components get merged
+            if (neighbour == sourceRoot):
+                sourceRoot = root
+            if (neighbour == targetRoot):
+                targetRoot = root
+        if (sourceRoot == targetRoot):
+            return count
+    return len(order) + 1
+
+def solvabilityCurve(thresholds, dimm, ps):
+    """
+    Turns connection thresholds into the probability that a grid with blocking probability p is solvable, for every p
+    With M free cells, Q(n) is the fraction of samples connected once n cells are open, and a grid with blocking
+    probability p has n open cells with probability Binomial(M, 1 - p), so P(solvable) = sum over n of B(n) * Q(n)
+    @params thresholds: output of connectionThresholds, dimm: dimension of grid, ps: blocking probabilities
+    @return array with the probability of solvability for each p
+    """
+    free = dimm * dimm - 2 if dimm > 1 else 0
+    n = np.arange(free + 1)
+    connected = np.cumsum(np.bincount(np.minimum(thresholds, free + 1), minlength=free + 2)[:free + 1]) / len(thresholds)
+    logFactorials = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, free + 1)))))
+    logChoose = logFactorials[free] - logFactorials - logFactorials[::-1]
+    curve = []
+    for p in np.atleast_1d(ps):
+        if (p <= 0):
+            curve.append(connected[free])
+            continue
+        if (p >= 1):
+            curve.append(connected[0])
+            continue
+        weights = np.exp(logChoose + n * math.log(1 - p) + (free - n) * math.log(p))
+        curve.append(np.dot(weights, connected))
+    return np.array(curve)
+
+def percolationSweep(dimm, ps, samples=1000, seed=None):
+    """
+    Solvability for every p in ps from a single set of Newman-Ziff samples
+    @return array with the probability of solvability for each p
+    """
+    return solvabilityCurve(connectionThresholds(dimm, samples, seed), dimm, ps)
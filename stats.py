@@ -0,0 +1,48 @@
+from time import perf_counter
+
+def newStats():
+    """
+    Collector for search statistics, handed to a search with stats=...
+    Searches keep their counts in the local variables they already use and report them here once when they finish,
+    so a search run without a collector (stats=None, the default) only pays for a flag check per expansion
+    Any number of searches can report to the same collector: counters add up, peakFringe keeps the largest fringe
+    seen and phases add up per name. For searches with a lazy-deletion heap the fringe is the heap, stale entries included
+    @return collector state: expansions, pushes, peakFringe, reopenings, heuristicCalls, searches (number of searches
+        reported), phases (seconds spent in each named phase: setup, search, path)
+    """
+    return {"expansions": 0, "pushes": 0, "peakFringe": 0, "reopenings": 0, "heuristicCalls": 0, "searches": 0, "phases": {}}
+
+def record(stats, since, expansions=0, pushes=0, peakFringe=0, reopenings=0, heuristicCalls=0):
+    """
+    Adds the counts of one finished search to a collector and ends its search phase, does nothing without a collector
+    @params stats: output of newStats or None, since: output of clock when the search phase started,
+        others: the search's counts
+    @return the current time, to start timing the next phase from
+    """
+    if (stats is None):
+        return None
+    stats["expansions"] += expansions
+    stats["pushes"] += pushes
+    stats["peakFringe"] = max(stats["peakFringe"], peakFringe)
+    stats["reopenings"] += reopenings
+    stats["heuristicCalls"] += heuristicCalls
+    stats["searches"] += 1
+    return phase(stats, "search", since)
+
+def clock(stats):
+    """
+    @return the current time if stats is a collector, None otherwise so disabled searches never read the clock
+    """
+    return perf_counter() if stats is not None else None
+
+def phase(stats, name, since):
+    """
+    Adds the time since a clock reading to a named phase
+    @params stats: output of newStats or None, name: phase name, since: output of clock or of the last phase call
+    @return the current time, to start timing the next phase from
+    """
+    if (stats is None):
+        return None
+    now = perf_counter()
+    stats["phases"][name] = stats["phases"].get(name, 0) + now - since
+    return now
@@ -0,0 +1,62 @@
+import numpy as np
+from collections import OrderedDict
+import grid as gd
+
+def zobristTable(dimm, seed=None):
+    """
+    Random 64 bit keys for Zobrist hashing of dimm x dimm grids, one per cell
+    @params dimm: dimension of grid, seed: int, SeedSequence or Generator
+    @return (dimm, dimm) nested list of ints, so single lookups stay cheap
+    """
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 2**64, size=(dimm, dimm), dtype=np.uint64).tolist()
+
+def zobristHash(grid, table):
+    """
+    Hash of a grid's walls: the XOR of the keys of every blocked cell
+    Flipping cell (y, x) between open and blocked changes the hash by table[y][x], so after a mutation the new hash
+    is hash ^ table[y][x] instead of a pass over the grid
+    @params grid: selected grid, table: output of zobristTable
+    @return hash as an int
+    """
+    keys = np.array(table, dtype=np.uint64)[np.asarray(grid) == gd.BLOCKED]
+    return int(np.bitwise_xor.reduce(keys)) if len(keys) > 0 else 0
+
+def newCache(limit=4096):
+    """
+    Bounded LRU cache, counting hits and misses. Keys can be anything hashable (grid hashes, packed grids), values
+    can't be None since that's what a miss returns
+    @params limit: most entries kept, least recently used ones are dropped first
+    @return cache state, passed to cacheLookup, cacheStore and hitRate
+    """
+    return {"entries": OrderedDict(), "limit": limit, "hits": 0, "misses": 0}
+
+def cacheLookup(cache, key):
+    """
+    @return the value stored for key, or None on a miss
+    """
+    entries = cache["entries"]
+    if (key in entries):
+        cache["hits"] += 1
+        entries.move_to_end(key)
+        return entries[key]
+    cache["misses"] += 1
+    return None
+
+def cacheStore(cache, key, value):
+    """
+    Stores a value, dropping the least recently used entry if the cache is full
+    """
+    entries = cache["entries"]
+    entries[key] = value
+    entries.move_to_end(key)
+    if (len(entries) > cache["limit"]):
+        entries.popitem(last=False)
+
+def hitRate(cache):
+    """
+    @params cache: output of newCache, or any dict with its hits and misses counts (like the sum of several caches')
+    @return hits, lookups and the fraction of lookups that were hits
+    """
+    lookups = cache["hits"] + cache["misses"]
+    return cache["hits"], lookups, cache["hits"] / lookups if lookups > 0 else 0
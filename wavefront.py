@@ -0,0 +1,141 @@
+import numpy as np
+import grid as gd
+import transposition as tp
+
+distanceFields = tp.newCache(64) #cache of distance fields, keyed on the open cells of the grid and the goal
+
+def wavefrontBFS(grids, start=(0, 0), goal=None):
+    """
+    Runs a BFS from start on every grid of a (K, d, d) stack at once, advancing all K frontiers together
+    The stack is bit-sliced: bit k of every word belongs to grid k, so each step is four shifted ORs and a mask over
+    (d, d, K/64) words, no matter how many grids there are
+    @params grids: a single grid or a (K, d, d) stack of grids, start: starting coordinates,
+        goal: goal coordinates (bottom right corner by default)
+    @return solved: True/False per grid, lengths: number of moves on the shortest path per grid (-1 if unsolvable)
+        for a single grid these are a bool and an int
+    """
+    grids = np.asarray(grids)
+    single = grids.ndim == 2
+    if (single):
+        grids = grids[np.newaxis]
+    count, height, width = grids.shape
+    if (goal is None):
+        goal = (height - 1, width - 1)
+    sy, sx = start
+    gy, gx = goal
+
+    free = packBits(grids != gd.BLOCKED) #open cells the wavefront hasn't reached yet
+    frontier = np.zeros_like(free)
+    frontier[sy, sx] = free[sy, sx]
+    free[sy, sx] = 0
+    solved = frontier[gy, gx].copy() #start == goal
+    lengths = np.full(count, -1)
+    lengths[unpackBits(solved, count)] = 0
+    step = 0
+    while True:
+        frontier &= ~solved #solved grids don't need to go any further
+        if (not frontier.any()): #every grid is either solved or out of cells to reach
+            break
+        step += 1
+        grow = np.zeros_like(frontier)
+        grow[1:] |= frontier[:-1] #down
+        grow[:-1] |= frontier[1:] #up
+        grow[:, 1:] |= frontier[:, :-1] #right
+        grow[:, :-1] |= frontier[:, 1:] #left
+        grow &= free
+        free ^= grow
+        frontier = grow
+        reachedGoal = frontier[gy, gx]
+        if (reachedGoal.any()):
+            lengths[unpackBits(reachedGoal, count)] = step
+            solved |= reachedGoal
+
+    solved = lengths >= 0
+    if (single):
+        return bool(solved[0]), int(lengths[0])
+    return solved, lengths
+
+def distanceField(grid, goal=None):
+    """
+    Exact BFS distance from every cell to the goal, found with one wavefront from the goal
+    Fields are cached on the grid's open cells and the goal, so asking again for an unchanged grid is a lookup, and
+    changing a cell between blocked and open gives a different key (fire doesn't, since burning cells are still open)
+    @params grid: selected grid, goal: goal coordinates (bottom right corner by default)
+    @return read-only (d, d) int32 array of distances, -1 where the goal can't be reached
+    """
+    openCells = np.asarray(grid) != gd.BLOCKED
+    if (goal is None):
+        goal = (openCells.shape[0] - 1, openCells.shape[1] - 1)
+    key = (openCells.shape, tuple(goal), np.packbits(openCells).tobytes())
+    cached = tp.cacheLookup(distanceFields, key)
+    if (cached is not None):
+        return cached
+
+    distances = np.full(openCells.shape, -1, dtype=np.int32)
+    free = openCells.copy() #open cells the wavefront hasn't reached yet
+    frontier = np.zeros_like(free)
+    frontier[goal] = free[goal]
+    free[goal] = False
+    distances[frontier] = 0
+    step = 0
+    rows = np.flatnonzero(frontier.any(axis=1))
+    while (len(rows) > 0):
+        #the wavefront only grows by one row per step, so just work on the band of rows around it
+        top = max(rows[0] - 1, 0)
+        bottom = rows[-1] + 2
+        band = frontier[top:bottom]
+        step += 1
+        grow = np.zeros_like(band)
+        grow[1:] |= band[:-1]
+        grow[:-1] |= band[1:]
+        grow[:, 1:] |= band[:, :-1]
+        grow[:, :-1] |= band[:, 1:]
+        grow &= free[top:bottom]
+        free[top:bottom] ^= grow
+        distances[top:bottom][grow] = step
+        frontier[top:bottom] = grow
+        rows = np.flatnonzero(grow.any(axis=1)) + top
+    distances.flags.writeable = False
+
+    tp.cacheStore(distanceFields, key, distances)
+    return distances
+
+def clearDistanceFields():
+    """
+    Empties the distance field cache, its hit and miss counts are kept
+    """
+    distanceFields["entries"].clear()
+
+def fieldPath(field, start):
+    """
+    Reads a shortest path straight out of a distance field, by stepping to a neighbour one closer to the goal each time
+    @params field: output of distanceField, start: starting coordinates
+    @return True/False if a path exists or not, order of nodes used to traverse path if one exists
+    """
+    y, x = start
+    if (field[y, x] < 0):
+        return False, None
+    height, width = field.shape
+    path = [(y, x)]
+    while (field[y, x] > 0):
+        for newY, newX in ((y, x-1), (y-1, x), (y, x+1), (y+1, x)):
+            if (0 <= newY < height and 0 <= newX < width and field[newY, newX] == field[y, x] - 1):
+                y, x = newY, newX
+                break
+        path.append((y, x))
+    return True, path
+
+def packBits(masks):
+    """
+    Packs a (K, d, d) stack of boolean masks into a (d, d, words) uint64 array, where bit k belongs to mask k
+    """
+    count = len(masks)
+    padded = np.zeros(masks.shape[1:] + (-(-count // 64) * 64,), dtype=bool)
+    padded[..., :count] = np.moveaxis(masks, 0, -1)
+    return np.packbits(padded, axis=-1, bitorder="little").view(np.uint64)
+
+def unpackBits(words, count):
+    """
+    Unpacks a vector of uint64 words back into one True/False per grid
+    """
+    return np.unpackbits(words.view(np.uint8), bitorder="little")[:count].astype(bool)